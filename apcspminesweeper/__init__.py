@@ -1,10 +1,73 @@
-from gym.envs.registration import register
+"""APCSP Minesweeper.
 
+Importing the package is cheap: gym, pygame and the environment are not
+imported. The environment is registered with gym right away if gym is
+already imported, otherwise as soon as gym is imported (by an import hook),
+so `import apcspminesweeper; import gym; gym.make(ENV_ID)` works in either
+order. Installed packages are also registered through the gym.envs entry
+point in setup.py, and register() can be called directly.
+"""
+import sys
 
-register(
-    id="apcsp-minesweeper-v0",
-    entry_point="apcspminesweeper.envs:Minesweeper",
-    kwargs={"rows": 9,
-            "cols": 9,
-            "w": 50}
-)
+ENV_ID = "apcsp-minesweeper-v0"
+_registered = False
+
+
+def register():
+    """
+    Register the Minesweeper environment with gym. Safe to call more than
+    once.
+    """
+    global _registered
+    if _registered:
+        return
+    from gym.envs.registration import register as gym_register
+    gym_register(
+        id=ENV_ID,
+        entry_point="apcspminesweeper.envs:make",
+        kwargs={"rows": 9,
+                "cols": 9,
+                "w": 50}
+    )
+    _registered = True
+
+
+def __getattr__(name):
+    if name == "Minesweeper":
+        from apcspminesweeper.envs.minesweeper import Minesweeper
+        return Minesweeper
+    if name == "util":
+        from apcspminesweeper.envs import util
+        return util
+    raise AttributeError("module {!r} has no attribute {!r}".format(
+        __name__, name))
+
+
+class _GymImportHook:
+    """
+    sys.meta_path finder registering the environment once gym has been
+    imported. Duck-typed: importing importlib.abc takes ~30 ms.
+    """
+
+    def find_spec(self, name, path, target=None):
+        if name != "gym":
+            return None
+        sys.meta_path.remove(self)  # Once, and not for the lookup below
+        import importlib.util
+        spec = importlib.util.find_spec(name)
+        if spec is None or spec.loader is None:
+            return spec
+        exec_module = spec.loader.exec_module
+
+        def exec_and_register(module):
+            exec_module(module)
+            register()
+
+        spec.loader.exec_module = exec_and_register
+        return spec
+
+
+if "gym" in sys.modules:
+    register()
+else:
+    sys.meta_path.insert(0, _GymImportHook())
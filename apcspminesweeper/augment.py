@@ -0,0 +1,71 @@
+"""Board symmetry augmentation.
+
+Minesweeper is unchanged by rotating or mirroring the board, so a
+transition (obs, action, reward, next obs) seen once is as good as its 8
+rotated and reflected copies (4 on non-square boards, where quarter turns
+change the shape). Dihedral transforms observations as NumPy views and
+maps cell actions with precomputed index tables.
+"""
+import numpy as np
+
+
+class Dihedral:
+
+    def __init__(self, rows, cols, seed=None):
+        """
+        Arguments:
+        rows - Number of rows.
+        cols - Number of columns.
+        seed - Seed for choosing transforms. None for unseeded.
+        """
+        self.rows = rows
+        self.cols = cols
+        self.size = rows * cols
+        # Transform k: k % 4 quarter turns, then a mirror if k >= 4
+        self.transforms = list(range(8)) if rows == cols else [0, 2, 4, 6]
+        self.rng = np.random.RandomState(seed)
+        cells = np.arange(self.size).reshape(rows, cols)
+        self.tables = {}  # k -> new flat index of each old flat index
+        for k in self.transforms:
+            table = np.empty(self.size, dtype=np.intp)
+            table[self.apply(cells, k).ravel()] = np.arange(self.size)
+            self.tables[k] = table
+
+    def sample(self, count):
+        """
+        Draw random transforms.
+        Arguments:
+        count - Number of transforms.
+        Returns:
+        Array of transform numbers.
+        """
+        return np.take(self.transforms,
+                       self.rng.randint(len(self.transforms), size=count))
+
+    @staticmethod
+    def apply(obs, k):
+        """
+        Transform an observation.
+        Arguments:
+        obs - Array with the board on its first two axes.
+        k - Transform number.
+        Returns:
+        Transformed view of obs.
+        """
+        view = np.rot90(obs, k % 4, axes=(0, 1))
+        if k >= 4:
+            view = view[:, ::-1]
+        return view
+
+    def action(self, action, k):
+        """
+        Map an action to the transformed board. Works for every action
+        kind (click, flag, chord), which repeat every size actions.
+        Arguments:
+        action - Action number or array of them.
+        k - Transform number.
+        Returns:
+        Transformed action.
+        """
+        kind, index = np.divmod(action, self.size)
+        return kind * self.size + self.tables[k][index]
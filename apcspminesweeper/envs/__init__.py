@@ -1,2 +1,40 @@
-from apcspminesweeper.envs.minesweeper import Minesweeper
-from . import util
+"""Minesweeper environment package.
+
+Only the pygame-free Board is imported eagerly. Minesweeper (gym) and the
+pygame modules are imported the first time they are accessed.
+"""
+import importlib
+import os
+
+from apcspminesweeper.envs.board import Board
+
+_LAZY_MODULES = ("minesweeper", "grid", "cell", "util", "uicontainer",
+                 "remote", "recorder", "monitor")
+
+
+def make(**kwargs):
+    """
+    gym entry point. Connects to the env server named by the
+    APCSP_MINESWEEPER_SERVER environment variable if it is set, otherwise
+    creates a local Minesweeper.
+    Arguments:
+    kwargs - Minesweeper arguments.
+    Returns:
+    Minesweeper or RemoteMinesweeper.
+    """
+    address = os.environ.get("APCSP_MINESWEEPER_SERVER")
+    if address:
+        from apcspminesweeper.envs.remote import RemoteMinesweeper
+        return RemoteMinesweeper(address, **kwargs)
+    from apcspminesweeper.envs.minesweeper import Minesweeper
+    return Minesweeper(**kwargs)
+
+
+def __getattr__(name):
+    if name == "Minesweeper":
+        from apcspminesweeper.envs.minesweeper import Minesweeper
+        return Minesweeper
+    if name in _LAZY_MODULES:
+        return importlib.import_module("." + name, __name__)
+    raise AttributeError("module {!r} has no attribute {!r}".format(
+        __name__, name))
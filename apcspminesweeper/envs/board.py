@@ -0,0 +1,187 @@
+"""Minesweeper board logic.
+
+Holds the state of a game as flat NumPy arrays indexed by j * cols + i,
+where i is the X (column) and j is the Y (row) of a cell. Reveals and flags
+are performed here; Grid only displays a board. Nothing in this module
+depends on pygame, so it can be used headless.
+"""
+import numpy as np
+
+from .topology import topology
+
+
+class Board:
+
+    def __init__(self, rows, cols, bomb_limit=10, bombs=None, seed=None):
+        """
+        Place bombs and count the touching bombs of every cell.
+        Arguments:
+        rows - Number of rows.
+        cols - Number of columns.
+        bomb_limit - Amount of bombs. Ignored if bombs is given.
+        bombs - Indices of bomb cells to use instead of a random layout.
+        seed - Seed for the random layout. None for an unseeded layout.
+        """
+        # Ensure no illegal dimensions
+        assert rows >= 1
+        assert cols >= 1
+        self.rows = rows
+        self.cols = cols
+        self.size = rows * cols
+        self.topology = topology(rows, cols)  # Shared by same-shape boards
+
+        # Generate random bomb indices
+        if bombs is None:
+            assert bomb_limit <= self.size
+            rng = np.random.RandomState(seed)
+            bombs = rng.choice(self.size, bomb_limit, replace=False)
+        self.bombs = np.zeros(self.size, dtype=bool)
+        self.bombs[np.asarray(bombs, dtype=np.intp)] = True
+        self.total_bombs = int(np.count_nonzero(self.bombs))
+
+        self.touching = self._count_touching()
+        self.revealed = np.zeros(self.size, dtype=bool)
+        self.flagged = np.zeros(self.size, dtype=bool)
+        self.remaining = self.size - self.total_bombs  # Safe cells left
+
+    def _count_touching(self):
+        """
+        Count the bombs touching each cell. Bomb cells count 0.
+        Returns:
+        Flat int8 array of touching counts.
+        """
+        total = self.topology.count(self.bombs)
+        total[self.bombs] = 0
+        return total
+
+    def index(self, i, j):
+        """
+        Get the index of cell (i, j).
+        Arguments:
+        i - X index (column).
+        j - Y index (row).
+        Returns:
+        Flat cell index.
+        """
+        return j * self.cols + i
+
+    def coordinates(self, index):
+        """
+        Get the coordinates of a cell index.
+        Arguments:
+        index - Flat cell index.
+        Returns:
+        Tuple coordinates (i, j).
+        """
+        j, i = divmod(int(index), self.cols)
+        return i, j
+
+    def neighbors(self, index):
+        """
+        Get the indices of the cells surrounding a cell.
+        Arguments:
+        index - Flat cell index.
+        Returns:
+        List of neighbor indices. Shared, do not modify.
+        """
+        return self.topology.lists[index]
+
+    def reveal(self, index):
+        """
+        Reveal a cell. Cells touching no bombs reveal their neighbors too.
+        Revealed and flagged cells are ignored.
+        Arguments:
+        index - Flat cell index.
+        Returns:
+        Array of the indices revealed by this call (empty if none).
+        """
+        if self.revealed[index] or self.flagged[index]:
+            return np.empty(0, dtype=np.intp)
+        self.revealed[index] = True
+        lists = self.topology.lists
+        out = []
+        stack = [index]
+        while stack:
+            k = stack.pop()
+            out.append(k)
+            if self.touching[k] == 0 and not self.bombs[k]:
+                for n in lists[k]:
+                    if not self.revealed[n] and not self.flagged[n]:
+                        self.revealed[n] = True
+                        stack.append(n)
+        out = np.array(out, dtype=np.intp)
+        self.remaining -= int(np.count_nonzero(~self.bombs[out]))
+        return out
+
+    def chord(self, index):
+        """
+        Reveal all unflagged covered neighbors of a revealed number that has
+        exactly as many flags around it as touching bombs. Wrong flags make
+        this reveal a bomb.
+        Arguments:
+        index - Flat cell index.
+        Returns:
+        Array of the indices revealed by this call (empty if none).
+        """
+        neighbors = self.topology.lists[index]
+        if not self.revealed[index] or self.bombs[index] \
+                or self.flagged[neighbors].sum() != self.touching[index]:
+            return np.empty(0, dtype=np.intp)
+        out = [self.reveal(n) for n in neighbors]
+        return np.concatenate(out)
+
+    def flag(self, index):
+        """
+        Toggle the flag on an unrevealed cell.
+        Arguments:
+        index - Flat cell index.
+        Returns:
+        True if the flag changed, False if the cell is revealed.
+        """
+        if self.revealed[index]:
+            return False
+        self.flagged[index] = not self.flagged[index]
+        return True
+
+    def snapshot(self):
+        """
+        Capture the state of the game on this board. Bombs and touching
+        counts never change, so only the masks and remaining count are kept.
+        Returns:
+        State tuple for restore().
+        """
+        return self.revealed.copy(), self.flagged.copy(), self.remaining
+
+    def restore(self, state):
+        """
+        Roll the board back (or forward) to a snapshot. The masks are
+        written in place, so views of them stay valid.
+        Arguments:
+        state - State tuple from snapshot() of this board.
+        Returns:
+        Array of the indices of the cells that changed.
+        """
+        revealed, flagged, self.remaining = state
+        changed = np.flatnonzero((self.revealed != revealed)
+                                 | (self.flagged != flagged))
+        self.revealed[changed] = revealed[changed]
+        self.flagged[changed] = flagged[changed]
+        return changed
+
+    def get_total_cells(self):
+        """
+        Get total cells.
+        Returns:
+        Cell count.
+        """
+        return self.size
+
+    def state_str(self):
+        """
+        Get basic overview information about the current
+        state of the board.
+        Returns:
+        State string.
+        """
+        return "Board {}x{}, Bombs: {}, Remaining: {}".format(
+            self.rows, self.cols, self.total_bombs, self.remaining)
@@ -4,6 +4,9 @@ Take note that a cell object has no reset function, meaning a reset
 must be done by deletion and recreation of a Cell object. Cell object
 coordinates are represented as: (i, j), where i is the X and j is the Y
 relative to the position in the grid array.S
+
+A cell only displays state; the reveal and flag logic lives in Board, and
+Grid.sync() copies it over.
 """
 import copy
 
@@ -50,8 +53,6 @@ class Cell(pygame.sprite.Sprite):
         self.touching = 0
         self.rows = rows
         self.cols = cols
-        self.actDebounce = False
-        self.surrounding = []
         self.tagged = False
         self.rendered_text = False  # To prevent Font.render() multiple times
         self.rendered_debug = False  # ^ but for coordinate display on cell
@@ -170,38 +171,6 @@ class Cell(pygame.sprite.Sprite):
         """
         self.image = copy.copy(im)
 
-    def action(self, cb=None):
-        """
-        Draw over the current image for the cell with the new information.
-        Arguments:
-        cb - Callback if valid click is made. Only argument is cell itself.
-        """
-        if not self.actDebounce and not self.flagged:
-            self.actDebounce = True
-            self.showSurrounding(cb)  # Only if touching = 0
-            # print(self.get_summary())
-            if cb is not None and not self.revealed:
-                cb(self)
-            self.revealed = True
-
-    def flag(self):
-        """
-        Add the flag image over the cell if it is flagged.
-        Remove flag image from the cell if it is being un-flagged.
-        """
-        self.flagged = not self.flagged
-
-    def showSurrounding(self, cb=None):
-        """
-        For all of the surrounding cells, reveal.
-        Only called when the self.touching == 0.
-        Arguments:
-        cb - Callback that action() recieves.
-        """
-        if self.touching == 0 and not self.bomb:
-            for neighbor in self.surrounding:
-                neighbor.action(cb)
-
     def coordinates(self):
         """
         Get a tuple of the grid coordinates of this cell.
@@ -6,7 +6,6 @@ import numpy as np
 import pygame
 
 from .cell import Cell
-from random import randint
 
 
 class Grid(pygame.sprite.Group):
@@ -14,27 +13,20 @@ class Grid(pygame.sprite.Group):
     bomb_img = None  # Bomb image
     font = None  # Cell font
 
-    def __init__(self, rows, cols, w=50, bomb_chance=4, bomb_limit=10,
-                 x_offset=0, y_offset=0):
+    def __init__(self, board, w=50):
         """
-        Generate a 2D list of safe and bomb cells.
+        Create a cell sprite for every cell of a board. The board holds the
+        game state; the grid only displays it.
         Arguments:
-        rows - Number of rows.
-        cols - Number of columns.
+        board - Board object to display.
         w - Width of a cell.
-        bomb_chance - Chance of a cell being a bomb. (Deprecated)
-        bomb_limit - Amount of bombs.
         """
         super().__init__()
-        self.rows = rows
-        self.cols = cols
-        self.total_bombs = bomb_limit
+        self.board = board
+        self.rows = board.rows
+        self.cols = board.cols
+        self.total_bombs = board.total_bombs
         self.w = w
-        self.bombs = []
-
-        # Ensure no illegal dimensions
-        assert rows >= 1
-        assert cols >= 1
 
         Cell.bomb_img = Grid.bomb_img
         Cell.font = Grid.font
@@ -42,38 +34,47 @@ class Grid(pygame.sprite.Group):
         Cell.uncover_img = Grid.uncover_img
         Cell.flag_img = Grid.flag_img
 
-        # Generate random bomb coordinates
-        if bomb_limit <= rows * cols:
-            bomb_tuples = set()
-            remaining = bomb_limit
-            while remaining != 0:
-                tx = randint(0, cols-1)
-                ty = randint(0, rows-1)
-                coord = self._coord_str(tx, ty)
-                # Avoid duplicates
-                if coord not in bomb_tuples:
-                    bomb_tuples.add(self._coord_str(tx, ty))
-                    remaining -= 1
-
         # Create grid
         self.id_table = {}  # For quick lookup
-        self.array = [[None for i in range(cols)] for j in range(rows)]
+        self.cells = []  # Flat, indexed like the board
+        self.array = [[None for i in range(self.cols)]
+                      for j in range(self.rows)]
         curr_id = 0
         for j in range(self.rows):  # Row (y)
             for i in range(self.cols):  # Column (x)
-                scoord = self._coord_str(i, j)
-                self.array[j][i] = Cell(i, j, self.w, curr_id,
-                                        bomb=scoord in bomb_tuples)
+                cell = Cell(i, j, self.w, curr_id,
+                            bomb=bool(board.bombs[curr_id]),
+                            rows=self.rows, cols=self.cols)
+                cell.touching = int(board.touching[curr_id])
+                self.array[j][i] = cell
+                self.cells.append(cell)
                 # Add to lookup table, but only coordinates (i, j)
                 self.id_table[str(curr_id)] = (i, j)
                 curr_id += 1
+        self.add(*self.cells)  # Add to group
+        self.sync(np.flatnonzero(board.revealed | board.flagged))
 
-        for j in range(self.rows):
-            for i in range(self.cols):
-                current = self.at(i, j)
-                self.get_neighbors(current)
-                self.set_touching(current)
-                self.add(current)  # Add to group
+    def sync(self, indices, revealed=None, flagged=None):
+        """
+        Copy the board state of the given cells into their sprites.
+        Arguments:
+        indices - Flat indices of the cells that changed.
+        revealed - Revealed mask to use instead of the board's.
+        flagged - Flagged mask to use instead of the board's.
+        """
+        if revealed is None:
+            revealed = self.board.revealed
+        if flagged is None:
+            flagged = self.board.flagged
+        for k in indices:
+            cell = self.cells[k]
+            if cell.revealed and not revealed[k]:
+                # Hidden again by a restore: drop the rendered images
+                cell._set_image(Cell.cover_img)
+                cell.rendered_text = False
+                cell.rendered_debug = False
+            cell.revealed = bool(revealed[k])
+            cell.flagged = bool(flagged[k])
 
     def for_each(self, callback, *args):
         """
@@ -97,8 +98,7 @@ class Grid(pygame.sprite.Group):
         Cell object if found, otherwise None.
         """
         if str(id) in self.id_table:
-            c = self.id_table[str(id)]
-            return self.array[c[1]][c[0]]
+            return self.cells[int(id)]
         else:
             return None
 
@@ -165,33 +165,6 @@ class Grid(pygame.sprite.Group):
         return "Grid {}x{}, Bombs: {}, w: {}".format(self.rows, self.cols,
                                                      self.total_bombs, self.w)
 
-    def _coord_str(self, x, y):
-        """
-        Convert coordinate into a string.
-        Arguments:
-        x - X coordinate.
-        y - Y coordinate.
-        Returns:
-        Coordinate string.
-        """
-        return ",".join([str(i) for i in [x, y]])
-
-    def get_neighbors(self, cell):
-        """
-        Add neighboring cells for the cell.surrounding list.
-        Arguments:
-        cell - Cell to detect neighbors with.
-        """
-        for a in range(-1, 2):
-            for b in range(-1, 2):
-                c = cell.i + a
-                d = cell.j + b
-                if c > -1 and c < self.rows and d > -1 and d < self.cols:
-                    # neighbor = grid[c][d]
-                    # grid[cell.i][cell.j].surrounding.insert(0, neighbor)
-                    neighbor = self.at(c, d)
-                    self.at(cell.i, cell.j).surrounding.insert(0, neighbor)
-
     def at(self, i, j):
         """
         Get cell at (i, j).
@@ -199,7 +172,7 @@ class Grid(pygame.sprite.Group):
         i - X index.
         j - Y index.
         """
-        return self.array[i][j]
+        return self.array[j][i]
 
     def detect_click(self, mx, my):
         """
@@ -207,27 +180,11 @@ class Grid(pygame.sprite.Group):
         Arguments:
         mx - Mouse X.
         my - Mouse Y.
-        """
-        pass
-
-    def set_touching(self, c: Cell):
-        """
-        Get the total amount of touching bomb cells and assign to cell
-        member 'touching'.
-        Arguments:
-        c - Cell to use.
         Returns:
-        -1 if bomb, otherwise None.
-        """
-        if c.bomb:
-            return -1
-        total = 0
-        for i in range(-1, 2):
-            for j in range(-1, 2):
-                a = i + c.i
-                b = j + c.j
-                if a > -1 and a < self.rows and b > -1 and b < self.cols:
-                    neighbor = self.array[a][b]
-                    if neighbor.bomb:
-                        total = total + 1
-        c.touching = total
+        Tuple coordinates (i, j) of the clicked cell, or None if outside.
+        """
+        i = mx // self.w
+        j = my // self.w
+        if 0 <= i < self.cols and 0 <= j < self.rows:
+            return i, j
+        return None
@@ -0,0 +1,150 @@
+"""Solver hint overlay.
+
+Shades covered cells by the solver's mine probability, marks cells known
+to be safe green and known mines dark red. The analysis runs in a worker
+process on a copy of the board state, so the window keeps its frame rate
+on big boards: each change of the board terminates the running analysis
+and starts a new one, and the overlay shows the latest finished result.
+
+Toggled with F9 in Minesweeper.
+"""
+import multiprocessing
+
+import numpy as np
+import pygame
+
+SAFE = -1  # Hint codes besides probability levels 0 to LEVELS
+MINE = -2
+LEVELS = 10
+SAFE_RGBA = (0, 200, 0, 110)
+MINE_RGBA = (120, 0, 0, 190)
+
+
+def _analyze(connection, rows, cols, bombs, revealed, flagged):
+    """
+    Worker process: analyze a board state and send the hint codes.
+    """
+    from apcspminesweeper import solver
+    from .board import Board
+    board = Board(rows, cols, bombs=bombs)
+    board.revealed[:] = revealed
+    board.flagged[:] = flagged
+    safe, mines, constraints = solver.deduce(board)
+    codes = np.full(board.size, LEVELS + 1, dtype=np.int8)  # No hint
+    for index, p in solver.probabilities(board, mines, constraints).items():
+        codes[index] = int(round(p * LEVELS))
+    codes[list(safe)] = SAFE
+    codes[list(mines)] = MINE
+    connection.send(codes)
+
+
+class HintOverlay:
+
+    def __init__(self):
+        self.board = None  # Board of the running or shown analysis
+        self.revealed = None  # Masks the analysis was started on
+        self.flagged = None
+        self.codes = None  # Latest finished hint codes per cell
+        self.worker = None
+        self.connection = None  # Pipe end of the running worker
+        self._tiles = {}  # Cell width -> {code: surface}
+
+    def update(self, board):
+        """
+        Restart the analysis if the board changed, and take finished
+        results. Never waits.
+        Arguments:
+        board - Board object being played.
+        """
+        if board is not self.board \
+                or not np.array_equal(board.revealed, self.revealed) \
+                or not np.array_equal(board.flagged, self.flagged):
+            self._start(board)
+        if self.connection is not None and self.connection.poll():
+            self.codes = self.connection.recv()
+            self.cancel()  # Done, only joins
+
+    def _start(self, board):
+        """
+        Cancel the running analysis and analyze a copy of a board state.
+        """
+        self.cancel()
+        if board is not self.board:
+            self.codes = None  # Hints of another board are meaningless
+        self.board = board
+        self.revealed = board.revealed.copy()
+        self.flagged = board.flagged.copy()
+        # A pipe per worker: terminating one can't break another's channel
+        self.connection, sender = multiprocessing.Pipe(duplex=False)
+        self.worker = multiprocessing.Process(
+            target=_analyze,
+            args=(sender, board.rows, board.cols,
+                  np.flatnonzero(board.bombs), self.revealed, self.flagged),
+            daemon=True)
+        self.worker.start()
+        sender.close()
+
+    def cancel(self):
+        """
+        Stop the running analysis, if any.
+        """
+        if self.worker is not None:
+            if self.worker.is_alive():
+                # SIGKILL: pygame's SIGTERM handler is inherited by the fork
+                self.worker.kill()
+            self.worker.join()
+            self.worker = None
+            self.connection.close()
+            self.connection = None
+
+    def _tile_set(self, cell):
+        """
+        Get the translucent tiles for a cell width.
+        Returns:
+        Dict of hint code to surface.
+        """
+        tiles = self._tiles.get(cell)
+        if tiles is None:
+            colors = {n: (255, 0, 0, int(150 * n / LEVELS))
+                      for n in range(LEVELS + 1)}
+            colors[SAFE] = SAFE_RGBA
+            colors[MINE] = MINE_RGBA
+            tiles = {}
+            for code, color in colors.items():
+                tiles[code] = pygame.Surface((cell, cell), pygame.SRCALPHA)
+                tiles[code].fill(color)
+            self._tiles[cell] = tiles
+        return tiles
+
+    def draw(self, surface, cell, x=0, y=0):
+        """
+        Draw the latest hints over covered cells.
+        Arguments:
+        surface - Surface the board was drawn on.
+        cell - Cell width on the surface.
+        x - Board pixel at the left edge of the surface.
+        y - Board pixel at the top edge of the surface.
+        """
+        if self.codes is None:
+            return
+        board = self.board
+        width, height = surface.get_size()
+        i0, j0 = x // cell, y // cell
+        i1 = min(board.cols, -(-(x + width) // cell))
+        j1 = min(board.rows, -(-(y + height) // cell))
+        j, i = np.mgrid[j0:j1, i0:i1]
+        indices = (j * board.cols + i).ravel()
+        codes = self.codes[indices]
+        shown = (codes <= LEVELS) & (codes != 0) & ~self.revealed[indices]
+        indices = indices[shown]
+        j, i = np.divmod(indices, board.cols)
+        tiles = self._tile_set(cell)
+        surface.blits([(tiles[k], (px, py)) for k, px, py in zip(
+            codes[shown].tolist(), (i * cell - x).tolist(),
+            (j * cell - y).tolist())], doreturn=False)
+
+    def close(self):
+        """
+        Stop the analysis.
+        """
+        self.cancel()
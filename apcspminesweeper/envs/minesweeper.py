@@ -6,47 +6,69 @@ Controls:
     F6: Show all bombs & disable lose.
     F7: Reset.
     F8: Show all cell debug coordinates.
+    F9: Toggle the solver hint overlay (see hints.py).
+    With camera=True, arrow keys, middle mouse drag and the mouse wheel
+    scroll and zoom (see viewport.py).
 
 Observation space (Box, 3 dimensions/channels):
-Representative of an image of the grid.
+Representative of an image of the grid. Per cell: touching count if
+revealed, 9 for a revealed bomb, 10 if flagged, otherwise 255.
 
 Action Spcae (Discrete):
 NUM     ACTION
 0       Click cell 0
 ...n-1  Click cell n-1
 
+With macro_actions, two more blocks of n actions follow:
+n...2n-1   Flag cell 0...n-1 (reward 0)
+2n...3n-1  Chord cell 0...n-1: reveal all unflagged neighbors of a
+           revealed number with as many flags around it as its number
+Flagging a revealed or flagged cell (flags are never removed, so flag loops
+can't stall an episode), flagging once there are as many flags as bombs,
+clicking a flagged cell (which does nothing) or a chord that reveals
+nothing counts as a click on a revealed cell.
+
 Reward:
 For every solve: 2.
 For every click on a non-revealed cell: 1.
 For every click on a revealed cell: -1.
 For every click on a bomb: -2.
+
+The game logic lives in Board, which needs only NumPy. pygame, the sprites
+and the images are only loaded when a window is used, so a headless env
+(headless=True) never imports them.
 """
 import os
-import argparse
 
-import scipy.misc as smp
-from PIL import Image
 import numpy as np
-import pygame
 from gym import spaces, Env
 
-from . import util
-from .grid import Grid
+from .board import Board
 # from grid_space import GridSpace
 
 
 class Minesweeper(Env):
 
     # For gym.Env
-    metadata = {"render.modes": ["human"]}
+    metadata = {"render.modes": ["human", "rgb_array"]}
+    # Action kinds, see module docstring
+    ACTION_CLICK = 0
+    ACTION_FLAG = 1
+    ACTION_CHORD = 2
     # The default font to use
     DEFAULT = "Comic Sans MS" if os.name == "nt" else "Arial"
+    # (w, asset arguments) -> (font, bomb, uncover, cover, flag), kept
+    # until pygame quits
+    _asset_cache = {}
 
     def __init__(self, rows, cols, w, font=None, font_ratio=0.6,
                  dwidth=800, dheight=600, fit=True, bomb_path="bomb.png",
                  uncover_path="cell_uncover.png", cover_path="cell_cover.png",
                  flag_path="flag.png", bomb_chance=4, bomb_limit=10,
-                 user_input=True, dbg_reveal=False, reveal_dry=True):
+                 user_input=True, dbg_reveal=False, reveal_dry=True,
+                 obs_view=False, headless=False, verbose=True,
+                 board_pool=None, macro_actions=False, render_fps=None,
+                 camera=False):
         """
         Initialize pygame and setup minesweeper. Invalid images may raise.
         Arguments:
@@ -68,6 +90,20 @@ class Minesweeper(Env):
         user_input - Allow user input.
         dbg_reveal - Reveal all cells? Calls _click_all_remaining().
         reveal_dry - 'dry' parameter for _click_all_remaining().
+        obs_view - Return a read-only view of the observation buffer instead
+                   of a copy. Only safe if the consumer does not keep the
+                   observation between steps.
+        headless - Run without pygame: no window, input or drawing.
+        verbose - Print game results.
+        board_pool - noguess.BoardPool to take boards from on reset. Its
+                     start cell is revealed for the player. Falls back to a
+                     random board while the pool is empty.
+        macro_actions - Add flag and chord actions to the action space.
+        render_fps - Draw on a background thread at this rate instead of on
+                     every draw() call. See renderer.py.
+        camera - Show the board through a scrollable, zoomable Viewport of
+                 at most dwidth x dheight (fitted to smaller boards) that
+                 only draws visible cells. See viewport.py.
         """
         self.rows = rows
         self.cols = cols
@@ -76,79 +112,289 @@ class Minesweeper(Env):
         self.detect_end = True  # Detect for win/loss?
         self.bomb_chance = bomb_chance
         self.bomb_limit = bomb_limit
-        self.remaining = (rows * cols) - bomb_limit
+        self.headless = headless
+        self.verbose = verbose
+        self.board_pool = board_pool
+        self.macro_actions = macro_actions
+        self.fit = fit
+        self.camera = camera
+        self.viewport = None  # Viewport if camera is set
+        self.hints = None  # HintOverlay while toggled on
+        if board_pool is not None:
+            assert (board_pool.rows, board_pool.cols,
+                    board_pool.bomb_limit) == (rows, cols, bomb_limit)
+        self.board = None
+        self.grid = None  # Sprites of the board, None if headless
+        self.renderer = None  # RenderThread if render_fps is set
+        self._assets = (font, font_ratio, bomb_path, uncover_path,
+                        cover_path, flag_path)
+        self._pixels = None  # rgb_array frame, shared with _offscreen
+        self._offscreen = None
+        self._spaces = {}  # (rows, cols) -> (action, observation) spaces
         self.lost = False  # Track win/loss state
         self.end = False  # Indicator of end of game
         self.end_callbacks = []  # List of callbacks to invoke after game end
         self.after_click = []  # List of callbacks to invoke after a click
+        # Callbacks given the flat indices of the cells _patch_obs() wrote
+        self.after_patch = []
         self.revealed_bombs = 0  # Track revealed bombs, when game ends.
         self.clicks = 0  # Click counter
+        self.obs_view = obs_view
+        # Persistent observation, patched only at newly revealed cells
+        self._obs = np.full((rows, cols, 3), 255, dtype=np.uint8)
+        self._obs_ro = self._obs.view()
+        self._obs_ro.flags.writeable = False
 
-        pygame.init()
-        pygame.display.set_caption("Minesweeper")
-        pygame.display.set_icon(util.load_scaled("icon.png", (32, 32)))
-
-        # Load shared resources
-        Grid.font = font
-        if font is None:
-            Grid.font = pygame.font.SysFont(Minesweeper.DEFAULT,
-                                            int(w * font_ratio))
-
-        Grid.bomb_img = util.load_scaled(bomb_path, (w, w))
-        Grid.uncover_img = util.load_scaled(uncover_path, (w, w))
-        Grid.cover_img = util.load_scaled(cover_path, (w, w))
-        Grid.flag_img = util.load_scaled(flag_path, (w - 12, w - 12))
-
+        self._max_display = (dwidth, dheight)  # Window limit of the camera
         if fit:
-            dwidth = rows * w
-            dheight = cols * w
+            dwidth, dheight = self._fitted(rows, cols, w)
         self.dwidth = dwidth
         self.dheight = dheight
+        self.gameDisplay = None
 
-        self.gameDisplay = pygame.display.set_mode((dwidth, dheight))
+        if not headless and render_fps:
+            from .renderer import RenderThread
+            self.renderer = RenderThread(self._init_display, w, render_fps,
+                                         resize=self._resize_display,
+                                         view=self._view)
+            self.renderer.start()
+        elif not headless:
+            self._init_display()
 
         # Init grid
         self.reset()
-        self.update()
-        self.draw()
 
         if dbg_reveal:
-            self.grid.for_each(self._click_all_remaining, reveal_dry)
+            self._click_all_remaining(reveal_dry)
+
+        self._set_spaces()
 
+    TEMP = "TEMP.png"
+
+    def _set_spaces(self):
+        """
+        Set the action and observation spaces for the current dimensions,
+        reusing the ones made before for them.
+        """
         # See module docstring for info
         # self.action_space = spaces.Tuple([spaces.Discrete(self.cols),
         #                                   spaces.Discrete(self.rows)])
-        self.action_space = spaces.Discrete(self.cols * self.rows)
-        #self.observation_space = spaces.Box(low=0,
-        #                                    high=255,
-        #                                    shape=(dheight, dwidth, 3))
-        self.observation_space = spaces.Box(low=0, high=255,
-                                            shape=(self.rows, self.cols, 3))
+        key = (self.rows, self.cols)
+        if key not in self._spaces:
+            kinds = 3 if self.macro_actions else 1
+            self._spaces[key] = (
+                spaces.Discrete(kinds * self.cols * self.rows),
+                spaces.Box(low=0, high=255,
+                           shape=(self.rows, self.cols, 3)))
+        self.action_space, self.observation_space = self._spaces[key]
+
+    def reconfigure(self, rows=None, cols=None, bomb_limit=None, w=None,
+                    board_pool=None):
+        """
+        Change the board dimensions, bomb count or cell width of a live env
+        and start a new game. pygame is not initialized again; the window is
+        resized if fit, and images and fonts are loaded once per cell width.
+        If the dimensions change, the observation buffer is replaced, so
+        views from obs_view are no longer updated.
+        Arguments:
+        rows - Number of rows. None keeps the current one.
+        cols - Number of columns. None keeps the current one.
+        bomb_limit - Amount of bombs. None keeps the current one.
+        w - Width of a cell. None keeps the current one.
+        board_pool - noguess.BoardPool for the new configuration. None keeps
+                     the current pool if it still matches the new
+                     configuration, otherwise drops it.
+        Returns:
+        Observation of the new game.
+        """
+        rows = self.rows if rows is None else rows
+        cols = self.cols if cols is None else cols
+        w = self.w if w is None else w
+        if bomb_limit is not None:
+            self.bomb_limit = bomb_limit
+        config = (rows, cols, self.bomb_limit)
+        if board_pool is not None:
+            assert (board_pool.rows, board_pool.cols,
+                    board_pool.bomb_limit) == config
+            self.board_pool = board_pool
+        elif self.board_pool is not None and (
+                self.board_pool.rows, self.board_pool.cols,
+                self.board_pool.bomb_limit) != config:
+            self.board_pool = None
+        if (rows, cols, w) != (self.rows, self.cols, self.w):
+            if (rows, cols) != (self.rows, self.cols):
+                self._obs = np.full((rows, cols, 3), 255, dtype=np.uint8)
+                self._obs_ro = self._obs.view()
+                self._obs_ro.flags.writeable = False
+            self.rows = rows
+            self.cols = cols
+            self.w = w
+            self._set_spaces()
+            if self.fit:
+                self.dwidth, self.dheight = self._fitted(rows, cols, w)
+            if self.viewport is not None and self.gameDisplay is None:
+                self.viewport.resize(self.dwidth, self.dheight, w)
+            self._pixels = None  # rgb_array buffer is made again on demand
+            self._offscreen = None
+            if self.gameDisplay is not None and self.renderer is None:
+                self._resize_display()
+            # The render thread resizes when it gets a board of the new size
+            if self.renderer is not None:
+                self.renderer.w = w
+        return self.reset()
+
+    def _init_display(self):
+        """
+        Initialize pygame, open the window and load the shared resources.
+        Returns:
+        Display surface.
+        """
+        import pygame
+        from . import util
 
-    TEMP = "TEMP.png"
+        pygame.init()
+        pygame.display.set_caption("Minesweeper")
+        pygame.display.set_icon(util.load_scaled("icon.png", (32, 32)))
+        return self._resize_display()
+
+    def _resize_display(self):
+        """
+        Load the resources for the current cell width and set the window to
+        the current display dimensions.
+        Returns:
+        Display surface.
+        """
+        import pygame
+        self._load_assets()
+        if self.viewport is not None:
+            self.viewport.resize(self.dwidth, self.dheight, self.w)
+        self.gameDisplay = pygame.display.set_mode((self.dwidth,
+                                                    self.dheight))
+        return self.gameDisplay
+
+    def _fitted(self, rows, cols, w):
+        """
+        Get the display dimensions fitted to a board.
+        Returns:
+        Tuple (width, height).
+        """
+        width = cols * w
+        height = rows * w
+        if self.camera:
+            width = min(width, self._max_display[0])
+            height = min(height, self._max_display[1])
+        return width, height
+
+    def _view(self, board):
+        """
+        Make the drawable view of a board: a Grid of sprites, or the
+        Viewport if camera is set, which keeps its camera between boards.
+        Arguments:
+        board - Board object.
+        Returns:
+        Grid or Viewport.
+        """
+        if not self.camera:
+            from .grid import Grid
+            return Grid(board, self.w)
+        if self.viewport is None:
+            from .viewport import Viewport
+            self.viewport = Viewport(board, self.w, self.dwidth,
+                                     self.dheight)
+        else:
+            self.viewport.set_board(board)
+        return self.viewport
+
+    def _load_assets(self):
+        """
+        Give Grid the font and images shared by all cells for the current
+        cell width, loaded or taken from the cache. Needs no window.
+        """
+        from .grid import Grid
+
+        # Shared resources
+        (Grid.font, Grid.bomb_img, Grid.uncover_img, Grid.cover_img,
+         Grid.flag_img) = Minesweeper._cached_assets(self.w, self._assets)
+
+    @staticmethod
+    def _cached_assets(w, assets):
+        """
+        Load the font and images for a cell width, or take them from the
+        cache. Needs no window.
+        Arguments:
+        w - Cell width.
+        assets - (font, font_ratio, bomb_path, uncover_path, cover_path,
+                 flag_path) tuple, as given to __init__.
+        Returns:
+        Tuple (font, bomb, uncover, cover, flag).
+        """
+        import pygame
+        from . import util
+
+        key = (w, assets)
+        if key not in Minesweeper._asset_cache:
+            (font, font_ratio, bomb_path, uncover_path, cover_path,
+             flag_path) = assets
+            pygame.font.init()
+            if font is None:
+                font = pygame.font.SysFont(Minesweeper.DEFAULT,
+                                           int(w * font_ratio))
+            Minesweeper._asset_cache[key] = (
+                font,
+                util.load_scaled(bomb_path, (w, w)),
+                util.load_scaled(uncover_path, (w, w)),
+                util.load_scaled(cover_path, (w, w)),
+                util.load_scaled(flag_path, (w - 12, w - 12)))
+        return Minesweeper._asset_cache[key]
+
+    def _init_offscreen(self):
+        """
+        Create the rgb_array surface on top of a NumPy buffer, so drawing
+        into it writes the returned pixels directly.
+        """
+        import pygame
+        if self.gameDisplay is None:  # No window, assets not loaded yet
+            self._load_assets()
+        width = self.cols * self.w
+        height = self.rows * self.w
+        if self.camera:  # Frames show the view, not the whole board
+            width = self.dwidth
+            height = self.dheight
+        self._pixels = np.zeros((height, width, 3), dtype=np.uint8)
+        self._offscreen = pygame.image.frombuffer(self._pixels,
+                                                  (width, height), "RGB")
 
     def _get_obs(self):
         """
         Get the current observation space. 'mini' image grab of the grid
-        surface.
+        surface. The buffer is kept up to date by _patch_obs(), so no cells
+        are visited here.
         Returns:
-        Updated observation space.
-        """
-        data = np.zeros((self.rows, self.cols, 3), dtype=np.uint8)
-        for j in range(self.rows):
-            for i in range(self.cols):
-                c = self.grid.at(i, j)
-                if not c.revealed:
-                    data[j, i] = 255
-                elif c.bomb:
-                    data[j, i] = 9
-                else:
-                    data[j, i] = c.touching
-        #obs = np.array(Image.frombytes("RGB",
-        #                               self.gameDisplay.get_rect().size,
-        #                               self.gameDisplay.get_buffer().raw))
-        #print("Observation shape: ", obs.shape)
-        return data
+        Copy of the observation buffer, or a read-only view of it if obs_view
+        is set.
+        """
+        if self.obs_view:
+            return self._obs_ro
+        return self._obs.copy()
+
+    def _patch_obs(self, indices):
+        """
+        Write changed cells into the observation buffer and the grid
+        sprites. Called wherever cells get revealed or flagged, so neither
+        ever needs to be rebuilt.
+        Arguments:
+        indices - Flat indices of the changed cells.
+        """
+        board = self.board
+        values = np.where(board.revealed[indices],
+                          np.where(board.bombs[indices], 9,
+                                   board.touching[indices]),
+                          np.where(board.flagged[indices], 10, 255))
+        self._obs.reshape(-1, 3)[indices] = values[:, None]
+        if self.grid is not None:
+            self.grid.sync(indices)
+        for callback in self.after_patch:
+            callback(indices)
 
     # For gym.Env:
     def step(self, action):
@@ -159,31 +405,45 @@ class Minesweeper(Env):
         """
         #print(action)
         assert self.action_space.contains(action)
-        cx, cy = self._get_action_coords(action)
-        # Check if cell already revealed
-        c_revealed = self.grid.at(cx, cy).revealed
-
-        # Perform action
-        self.click_cell(cx, cy)
+        kind, index = divmod(int(action), self.rows * self.cols)
+        cx, cy = self._get_action_coords(index)
+
+        # Perform action. Useless actions are clicks on a revealed cell
+        if kind == Minesweeper.ACTION_FLAG:
+            board = self.board
+            useless = board.revealed[index] or board.flagged[index] \
+                or np.count_nonzero(board.flagged) >= board.total_bombs
+            if not useless:
+                self.flag_cell(cx, cy)
+        elif kind == Minesweeper.ACTION_CHORD:
+            useless = not len(self.chord_cell(cx, cy))
+        else:
+            useless = self.board.revealed[index] \
+                or self.board.flagged[index]
+            self.click_cell(cx, cy)
 
-        # Check if lost/won
-        self.update()  # Ctrl + C will force end
+        # Check if lost/won. Resetting is left to the caller once done.
+        self.update(auto_reset=False)  # Ctrl + C will force end
         self.draw()
         done = self.end
         if done:
             if self.lost:
-                print("Game lost")
+                if self.verbose:
+                    print("Game lost")
                 if self.clicks != 1:
                     reward = -1.0  # Punish lost
                 else:
                     reward = 0.1  # First click is random, dont punish
             else:
-                print("Game won")
+                if self.verbose:
+                    print("Game won")
                 reward = 1.0  # Reward solve
         else:
-            if c_revealed:  # Cell already clicked
+            if useless:  # Cell already clicked
                 reward = -.5  # Punish uselessness
                 done = True
+            elif kind == Minesweeper.ACTION_FLAG:
+                reward = 0.0  # Flags are only a means to chord
             else:
                 reward = 0.90  # Reward valid action
 
@@ -201,100 +461,116 @@ class Minesweeper(Env):
         Returns:
         I and J integers.
         """
-        return self.grid.get_by_id(action).location
+        return self.board.coordinates(action)
 
-    def update(self) -> bool:
+    def update(self, auto_reset=True) -> bool:
         """
         Perform default logical updates for the game.
+        Arguments:
+        auto_reset - Start a new game if the current one has ended.
         Returns:
         False if pygame.QUIT is recieved, True otherwise.
         """
         # Check for game end
-        if self.end:
-            print("Minesweeper end game detected.")
-            self._invoke_end(self.end_callbacks)
+        if self.end and auto_reset:
+            if self.verbose:
+                print("Minesweeper end game detected.")
+            self.reset()
 
+        if self.headless:
+            return True
+        if self.renderer is not None:  # Events belong to the render thread
+            return not self.renderer.quit_requested
+
+        import pygame
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
                 return False
+            elif self.viewport is not None \
+                    and self.viewport.handle_event(event):
+                continue
             elif event.type == pygame.MOUSEBUTTONUP:
-                self.grid.for_each(self._detect_click, event)
+                self._detect_click(event)
             elif event.type == pygame.KEYUP:
                 if event.key == pygame.K_F5:
-                    self.grid.for_each(self._show_all_bombs)
+                    self._show_all_bombs()
                 elif event.key == pygame.K_F6:
-                    self.grid.for_each(self._click_all_remaining)
+                    self._click_all_remaining()
                 elif event.key == pygame.K_F7:
                     self.end_game(False)
-                elif event.key == pygame.K_F8:
+                elif event.key == pygame.K_F8 and self.viewport is None:
                     self.grid.for_each(self._show_cell_debug)
+                elif event.key == pygame.K_F9:
+                    self.toggle_hints()
+
+        if self.hints is not None:  # Restarts the analysis on changes
+            self.hints.update(self.board)
 
         self.grid.update()
         return True
 
-    def _detect_click(self, cell, event):
+    def toggle_hints(self):
+        """
+        Show or hide the solver hint overlay. Window only.
+        """
+        if self.hints is None:
+            from .hints import HintOverlay
+            self.hints = HintOverlay()
+        else:
+            self.hints.close()
+            self.hints = None
+            if self.viewport is not None:
+                self.viewport.dirty = True  # Draw over the last hints
+
+    def _detect_click(self, event):
         """
-        Default callback to detect if a bomb was clicked.
+        Click or flag the cell under a mouse event.
         Arguments:
-        cell - Cell object.
-        Returns:
-        True until cell is clicked.
+        event - pygame.MOUSEBUTTONUP event.
         """
         # Detect if user input allowed
         if not self.user_input:
-            return False
-
-        if event.pos[0] > cell.x \
-                and event.pos[0] < cell.x + self.w \
-                and event.pos[1] > cell.y \
-                and event.pos[1] < cell.y + self.w:
-            if event.button == 1:
-                cell.action(self._after_action)
+            return
 
-            elif event.button == 3:
-                cell.flag()
-            return False
-        return True
+        location = self.grid.detect_click(*event.pos)
+        if location is None:
+            return
+        if event.button == 1:
+            self.click_cell(*location)
+        elif event.button == 3:
+            self.flag_cell(*location)
 
-    # Callbacks:
-    def _show_all_bombs(self, cell):
+    # Debug helpers:
+    def _show_all_bombs(self):
         """
-        Reveal (but do not end game) all bombs. Callback.
-        Arguments:
-        cell - Cell object.
-        Returns:
-        True for the entire loop.
+        Reveal (but do not end game) all bombs.
         """
-        if cell.bomb:
-            cell.action()  # Should not end game
-        return True
+        board = self.board
+        for index in np.flatnonzero(board.bombs & ~board.revealed):
+            self._patch_obs(board.reveal(index))
 
-    def _click_all_remaining(self, cell, dry=True):
+    def _click_all_remaining(self, dry=True):
         """
-        For test purposes. Callback to click all remaining cells
-        that are not bombs.
+        For test purposes. Click all remaining cells that are not bombs.
         Arguments:
-        cell - Cell object.
         dry - False = game win is desired (remaining count is modified).
-        Returns:
-        True for entire loop.
         """
-        if not cell.bomb:
-            cell.action(self._after_action if not dry else None)
-        return True
+        board = self.board
+        remaining = board.remaining
+        for index in np.flatnonzero(~board.bombs & ~board.revealed):
+            if dry:
+                self._patch_obs(board.reveal(index))
+            else:
+                self.click_cell(*board.coordinates(index))
+        if dry:
+            board.remaining = remaining  # Dry reveals never win
 
-    def _click_a_bomb(self, cell):
+    def _click_a_bomb(self):
         """
-        For test purposes. Callback to click the first encountered bomb.
-        Arguments:
-        cell - Cell object.
-        Returns:
-        True until bomb is found.
+        For test purposes. Click the first bomb.
         """
-        if cell.bomb:
-            cell.action(self._after_action)
-            return False
-        return True
+        index = np.flatnonzero(self.board.bombs)[0]
+        self.click_cell(*self.board.coordinates(index))
 
     def _show_cell_debug(self, cell):
         """
@@ -307,28 +583,33 @@ class Minesweeper(Env):
         cell.enable_debug()
         return True
 
-    def _after_action(self, cell):
+    def _after_action(self, index, revealed):
         """
-        Default after valid cell action callback. "Valid" meaning the cell
-        was not revealed or flagged yet. Only reduces remaining count.
+        Default after valid click handling. "Valid" meaning the cell was not
+        revealed or flagged yet, so at least one cell was revealed. Patches
+        the observation buffer and detects the end of the game.
         Arguments:
-        cell - Cell object action is performed on successfully.
+        index - Flat index of the clicked (or chorded) cell.
+        revealed - Flat indices of the cells the click revealed.
         """
+        self._patch_obs(revealed)
         self.clicks += 1
-        # print(cell)
-        if cell.bomb and not cell.flagged:
+        if self.board.bombs[revealed].any():
             self.end_game(True)  # Lose game
-            return
-        if not cell.revealed and not cell.flagged:
-            self.remaining -= 1
         # Detect game win
-        if self.remaining <= 0:
+        elif self.remaining <= 0:
             self.end_game(False)
 
     def end_game(self, lost: bool):
+        """
+        Mark the game as ended and invoke the end callbacks. The next update()
+        starts a new game.
+        Arguments:
+        lost - Was the game lost?
+        """
         self.lost = lost
         self.end = True
-        self._invoke_end(self.end_callbacks, reset=True)
+        self._invoke_end(self.end_callbacks, reset=False)
 
     def set_end_callbacks(self, cb: list):
         """
@@ -343,20 +624,76 @@ class Minesweeper(Env):
         """
         Quit pygame.
         """
-        pygame.quit()
+        if self.hints is not None:
+            self.hints.close()
+        if self.renderer is not None:
+            self.renderer.stop()
+        elif not self.headless:
+            import pygame
+            pygame.quit()
+        Minesweeper._asset_cache.clear()  # Fonts die with pygame
 
     # Env inheritance
     def render(self, mode="human"):
         """
         Derived from gym.Env.
+        Arguments:
+        mode - "human" draws the window. "rgb_array" draws the grid on an
+               offscreen surface, which needs no window (works headless).
+        Returns:
+        For rgb_array, a read-only (rows * w, cols * w, 3) uint8 view of the
+        surface pixels. Not a copy: the next render overwrites it.
         """
+        if mode == "rgb_array":
+            return self._render_rgb_array()
         self.draw()
 
+    def _render_rgb_array(self):
+        """
+        Draw the grid onto the offscreen surface.
+        Returns:
+        Read-only view of its pixels.
+        """
+        assert self.renderer is None, "rgb_array needs render_fps=None"
+        if self._offscreen is None:
+            self._init_offscreen()
+        if self.grid is None:  # Headless: sprites are built on demand
+            self.grid = self._view(self.board)
+        self.grid.update()
+        if self.viewport is not None and not self.headless:
+            # The viewport's dirty state tracks the window: draw every
+            # visible cell here and leave the window's state as it was
+            viewport = self.viewport
+            dirty, pending = viewport.dirty, viewport.pending
+            viewport.dirty = True
+            viewport.draw(self._offscreen)
+            viewport.dirty, viewport.pending = dirty, pending
+        else:
+            self.grid.draw(self._offscreen)
+        view = self._pixels.view()
+        view.flags.writeable = False
+        return view
+
     def draw(self, flip=True):
         """
-        Draw the grid and optionally flip the display.
+        Draw the grid and optionally flip the display. Does nothing if
+        headless. With a render thread, only publishes the board to it.
         """
+        if self.headless:
+            return
+        if self.renderer is not None:
+            self.renderer.publish(self.board)
+            return
+        import pygame
+        if self.hints is not None and self.viewport is not None:
+            self.viewport.dirty = True  # Draw over last frame's hints
         self.grid.draw(self.gameDisplay)
+        if self.hints is not None:
+            if self.viewport is None:
+                self.hints.draw(self.gameDisplay, self.w)
+            else:
+                self.hints.draw(self.gameDisplay, self.viewport.cell,
+                                self.viewport.x, self.viewport.y)
         if flip:
             pygame.display.flip()
 
@@ -377,33 +714,138 @@ class Minesweeper(Env):
 
     def click_cell(self, i, j):
         """
-        Call an action at cell (i, j).
+        Call an action at cell (i, j). Ignored once the game has ended.
         Arguments:
         i - Column.
         j - Row.
         Returns:
-        Generator of integer values of the grid after action.
+        Flat indices of the cells revealed by the click.
         """
-        #print("Cell click at ", self.grid.at(i, j).coordinates())
-        self.grid.at(i, j).action(self._after_action)
-        return self.get_grid_vals()
+        if self.end:
+            return np.empty(0, dtype=np.intp)
+        index = self.board.index(i, j)
+        revealed = self.board.reveal(index)
+        if len(revealed):
+            self._after_action(index, revealed)
+        return revealed
 
-    def reset(self):
+    def flag_cell(self, i, j):
         """
-        Creates a new Grid object to be used when game is reset.
+        Toggle the flag at cell (i, j).
+        Arguments:
+        i - Column.
+        j - Row.
+        Returns:
+        True if the flag changed.
         """
-        self.end = False
-        self.clicks = 0
-        self.grid = Grid(self.rows, self.cols, self.w,
-                         bomb_chance=self.bomb_chance,
-                         bomb_limit=self.bomb_limit)
-        self.remaining = self.get_total_cells() - self.bomb_limit
+        if self.end:
+            return False
+        index = self.board.index(i, j)
+        changed = self.board.flag(index)
+        if changed:
+            self._patch_obs([index])
+        return changed
+
+    def chord_cell(self, i, j):
+        """
+        Chord at cell (i, j): reveal the unflagged neighbors of a revealed
+        number whose flags match it. Ignored once the game has ended.
+        Arguments:
+        i - Column.
+        j - Row.
+        Returns:
+        Flat indices of the cells revealed by the chord.
+        """
+        if self.end:
+            return np.empty(0, dtype=np.intp)
+        index = self.board.index(i, j)
+        revealed = self.board.chord(index)
+        if len(revealed):
+            self._after_action(index, revealed)
+        return revealed
+
+    @property
+    def remaining(self):
+        """
+        The remaining cells that need to be cleared.
+        """
+        return self.board.remaining
+
+    def reset(self, seed=None):
+        """
+        Creates a new Board (and Grid, unless headless) to be used when game
+        is reset.
+        Arguments:
+        seed - Seed for the bomb layout. None for an unseeded layout, or a
+               board from board_pool if one is set.
+        """
+        layout = None
+        if self.board_pool is not None and seed is None:
+            layout = self.board_pool.get()
+        if layout is None:
+            start = None
+            board = Board(self.rows, self.cols,
+                          bomb_limit=self.bomb_limit, seed=seed)
+        else:
+            bombs, start = layout
+            board = Board(self.rows, self.cols, bombs=bombs)
         #print("Grid reset. Remaining: ", self.remaining, " ",
-        #      self.grid.state_str())
+        #      self.board.state_str())
+        self.set_board(board)
+        if start is not None:  # No-guess boards come with their opening
+            self._patch_obs(self.board.reveal(start))
+            # Counted, so the next click isn't treated as a random first one
+            self.clicks = 1
         self.update()
         self.draw()
         return self._get_obs()
 
+    def set_board(self, board):
+        """
+        Start a new game on a given board, which may already have revealed
+        or flagged cells. Does not update or draw.
+        Arguments:
+        board - Board object of the env's dimensions.
+        """
+        assert (board.rows, board.cols) == (self.rows, self.cols)
+        self.end = False
+        self.lost = False
+        self.clicks = 0
+        self.board = board
+        self.grid = None
+        if not self.headless and self.renderer is None:
+            self.grid = self._view(board)
+        self._obs.fill(255)  # In place, keeps views valid
+        self._patch_obs(np.flatnonzero(board.revealed | board.flagged))
+
+    def snapshot(self):
+        """
+        Capture the game state for search: the board masks, remaining count,
+        clicks and end flags. No sprites or surfaces are copied.
+        Returns:
+        Snapshot tuple for restore().
+        """
+        return (self.board, self.board.snapshot(), self.clicks, self.end,
+                self.lost)
+
+    def restore(self, snapshot):
+        """
+        Return to a snapshot, e.g. after trying actions. Only the cells that
+        differ are patched into the observation buffer and the grid.
+        Does not update or draw.
+        Arguments:
+        snapshot - Snapshot tuple from snapshot().
+        """
+        board, state, clicks, end, lost = snapshot
+        if board is self.board:
+            self._patch_obs(board.restore(state))
+        else:
+            board.restore(state)
+            self.set_board(board)
+        self.clicks = clicks
+        self.end = end
+        self.lost = lost
+
     def get_grid_vals(self):
         """
         Get a grid value generator to feed to the network.
@@ -424,11 +866,11 @@ class Minesweeper(Env):
     def get_total_cells(self):
         """
         Get total amount of cells in the grid. Wrapper for
-        grid.get_total_cells().
+        board.get_total_cells().
         Returns:
         Cell count.
         """
-        return self.grid.get_total_cells()
+        return self.board.get_total_cells()
 
     @staticmethod
     def arg_parser(parser=None):
@@ -441,6 +883,7 @@ class Minesweeper(Env):
         ArgumentParser.
         """
         if parser is None:
+            import argparse
             parser = argparse.ArgumentParser()
         parser.add_argument("--no-fit",
                             action="store_false",
@@ -0,0 +1,123 @@
+"""Mosaic monitor of many boards.
+
+Shows the observations of N boards tiled in one window at a small cell
+size, i.e. for watching a batch of envs training in parallel. Observation
+values (0-8, 9 bomb, 10 flag, 255 covered) pick one of a dozen tile
+surfaces shared by every board. A refresh only blits the cells that
+changed since the last one and updates the display once, for the
+rectangles of the boards that changed, so hundreds of boards can be
+watched at little cost.
+
+The tiles are made from the font and images Minesweeper caches for its
+cells. pygame has one window per process and the monitor opens it, so use
+the monitor with headless envs or in a process of its own.
+
+i.e.
+    monitor = MosaicMonitor(len(envs), 9, 9)
+    while monitor.update([env.step(policy(env))[0] for env in envs]):
+        ...
+"""
+import math
+import time
+
+import numpy as np
+import pygame
+
+from .viewport import COVERED, make_tiles
+
+# Observation value -> tile index
+CODES = np.full(256, COVERED, dtype=np.intp)
+CODES[:11] = np.arange(11)
+REFERENCE_W = 50  # Cell width the assets are loaded at before scaling
+
+
+class MosaicMonitor:
+
+    def __init__(self, count, rows, cols, w=6, columns=None, gap=2, fps=30,
+                 font=None, font_ratio=0.6, bomb_path="bomb.png",
+                 uncover_path="cell_uncover.png", cover_path="cell_cover.png",
+                 flag_path="flag.png"):
+        """
+        Open the monitor window. The process must not have a window yet.
+        Arguments:
+        count - Number of boards.
+        rows - Rows of each board.
+        cols - Columns of each board.
+        w - Width of a cell in the mosaic.
+        columns - Boards per row of the mosaic. None for a square layout.
+        gap - Pixels between boards.
+        fps - Refreshes per second, at most. Updates in between are skipped
+              and drawn by the next refresh.
+        font, font_ratio, bomb_path, uncover_path, cover_path, flag_path -
+            Cell assets, as given to Minesweeper.
+        """
+        from .minesweeper import Minesweeper
+
+        self.count = count
+        self.rows = rows
+        self.cols = cols
+        self.w = w
+        self.columns = columns or math.ceil(math.sqrt(count))
+        self.tile_w = cols * w + gap
+        self.tile_h = rows * w + gap
+        self.period = 1 / fps if fps else 0
+        self.last_refresh = 0
+        self.quit_requested = False
+
+        pygame.init()
+        assert pygame.display.get_surface() is None, \
+            "the monitor needs a process without a window"
+        pygame.display.set_caption("Minesweeper monitor")
+        lines = math.ceil(count / self.columns)
+        self.display = pygame.display.set_mode(
+            (self.columns * self.tile_w - gap, lines * self.tile_h - gap))
+        assets = (font, font_ratio, bomb_path, uncover_path, cover_path,
+                  flag_path)
+        self.tiles = make_tiles(
+            w, REFERENCE_W, *Minesweeper._cached_assets(REFERENCE_W, assets))
+        # Tile shown per cell; -1 until first drawn
+        self.shown = np.full((count, rows, cols), -1, dtype=np.intp)
+        n = np.arange(count)
+        self.left = (n % self.columns) * self.tile_w  # Board origins
+        self.top = (n // self.columns) * self.tile_h
+
+    def update(self, observations):
+        """
+        Refresh the window with the current observations, unless the last
+        refresh was less than 1 / fps ago. Handles the window events.
+        Arguments:
+        observations - Observations of the boards in order, as an array
+                       (count, rows, cols, 3) or a sequence of arrays.
+        Returns:
+        False once the window was closed, True otherwise.
+        """
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                self.quit_requested = True
+        now = time.perf_counter()
+        if self.quit_requested or now - self.last_refresh < self.period:
+            return not self.quit_requested
+        self.last_refresh = now
+
+        codes = CODES[np.asarray(observations)[..., 0]]
+        n, j, i = np.nonzero(codes != self.shown)
+        if not len(n):
+            return True
+        self.shown[n, j, i] = codes[n, j, i]
+        xs = (self.left[n] + i * self.w).tolist()
+        ys = (self.top[n] + j * self.w).tolist()
+        tiles = self.tiles
+        self.display.blits([(tiles[k], (x, y)) for k, x, y in
+                            zip(codes[n, j, i].tolist(), xs, ys)],
+                           doreturn=False)
+        changed = np.unique(n)
+        pygame.display.update([
+            (int(self.left[k]), int(self.top[k]), self.cols * self.w,
+             self.rows * self.w) for k in changed])
+        return True
+
+    def close(self):
+        """
+        Close the window.
+        """
+        pygame.display.quit()
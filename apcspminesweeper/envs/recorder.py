@@ -0,0 +1,206 @@
+"""Episode video recording.
+
+EpisodeRecorder wraps a Minesweeper env and keeps, per step, only the cells
+that changed, as reported by the env's after_patch callbacks, so stepping
+never scans the board. When an episode ends and the select policy wants it, the
+episode is put on a bounded queue without waiting; if the queue is full
+the episode is dropped. Worker processes replay the episodes on a headless
+env, rasterize them with render("rgb_array") and write an animated GIF
+(needs Pillow) or one PNG file per frame.
+
+i.e. EpisodeRecorder(env, "videos", select=losses_only(every(10)))
+"""
+import importlib.util
+import multiprocessing
+import os
+import queue
+
+import numpy as np
+from gym import Wrapper
+
+from .board import Board
+
+# Episode outcomes. Invalid episodes ended on a useless action (a click on
+# a revealed cell) before the game was won or lost.
+WON = "won"
+LOST = "lost"
+INVALID = "invalid"
+
+
+def outcome(env):
+    """
+    Get the outcome of a finished episode.
+    Arguments:
+    env - Minesweeper env, after step() returned done.
+    Returns:
+    WON, LOST or INVALID.
+    """
+    if not env.end:
+        return INVALID
+    return LOST if env.lost else WON
+
+
+def every(n):
+    """
+    Select every nth episode.
+    Arguments:
+    n - Episode interval.
+    Returns:
+    Select callable.
+    """
+    return lambda episode, result: episode % n == 0
+
+
+def losses_only(select=None):
+    """
+    Select failed episodes only: lost or invalid ones.
+    Arguments:
+    select - Optional policy that must also select the episode.
+    Returns:
+    Select callable.
+    """
+    return lambda episode, result: result != WON and (
+        select is None or select(episode, result))
+
+
+class EpisodeRecorder(Wrapper):
+
+    def __init__(self, env, out_dir, select=None, fmt="gif", w=20, fps=4,
+                 workers=1, queue_size=16):
+        """
+        Arguments:
+        env - Minesweeper env.
+        out_dir - Directory for the videos. Created if missing.
+        select - Callable (episode number, outcome) -> bool choosing the
+                 episodes to record, with outcome WON, LOST or INVALID.
+                 None records all of them.
+        fmt - "gif" for animated GIFs or "png" for frame files.
+        w - Width of a cell in the video.
+        fps - Frames per second of GIFs.
+        workers - Encoder processes.
+        queue_size - Episodes waiting for an encoder before new ones are
+                     dropped.
+        """
+        super().__init__(env)
+        assert fmt in ("gif", "png")
+        if fmt == "gif" and importlib.util.find_spec("PIL") is None:
+            raise ImportError("GIF recording needs Pillow, use fmt='png'")
+        os.makedirs(out_dir, exist_ok=True)
+        self.select = select
+        self.episode = -1
+        self.dropped = 0  # Episodes lost to a full queue
+        self.steps = None  # (indices, observation values) per frame
+        self._patches = []  # Patches of the current frame
+        self.env.unwrapped.after_patch.append(self._collect)
+        self.jobs = multiprocessing.Queue(queue_size)
+        self.workers = []
+        for _ in range(workers):
+            worker = multiprocessing.Process(
+                target=_encode, args=(self.jobs, out_dir, fmt, w, fps),
+                daemon=True)
+            worker.start()
+            self.workers.append(worker)
+
+    def reset(self, **kwargs):
+        self._patches = []
+        obs = self.env.reset(**kwargs)
+        self.episode += 1
+        self.steps = []
+        self._record()  # No-guess boards start with an opening
+        return obs
+
+    def step(self, action):
+        obs, reward, done, info = self.env.step(action)
+        env = self.env.unwrapped
+        self._record()
+        if done:
+            self._finish(env.board, outcome(env))
+        return obs, reward, done, info
+
+    def _collect(self, indices):
+        """
+        after_patch callback: keep the patched cells and their new
+        observation values.
+        """
+        indices = np.array(indices, dtype=np.intp)
+        values = self.env.unwrapped._obs.reshape(-1, 3)[indices, 0]
+        self._patches.append((indices, values))
+
+    def _record(self):
+        """
+        End the current frame with the cells patched since the last one.
+        """
+        patches, self._patches = self._patches, []
+        if not patches:
+            self.steps.append((np.empty(0, dtype=np.intp),
+                               np.empty(0, dtype=np.uint8)))
+        elif len(patches) == 1:
+            self.steps.append(patches[0])
+        else:  # In order, so later values of a cell win
+            self.steps.append((np.concatenate([p[0] for p in patches]),
+                               np.concatenate([p[1] for p in patches])))
+
+    def _finish(self, board, result):
+        """
+        Hand a finished episode to the encoders if selected.
+        """
+        steps, self.steps = self.steps, []
+        if self.select is not None and not self.select(self.episode, result):
+            return
+        job = (self.episode, result, board.rows, board.cols,
+               np.flatnonzero(board.bombs), steps)
+        try:
+            self.jobs.put_nowait(job)
+        except queue.Full:
+            self.dropped += 1
+
+    def close(self):
+        """
+        Let the encoders finish the queued episodes, then stop them.
+        """
+        self.env.unwrapped.after_patch.remove(self._collect)
+        for _ in self.workers:
+            self.jobs.put(None)
+        for worker in self.workers:
+            worker.join()
+        self.workers = []
+        self.env.close()
+
+
+def _encode(jobs, out_dir, fmt, w, fps):
+    """
+    Encoder process loop: replay episodes and write them until None.
+    """
+    from .minesweeper import Minesweeper
+    env = None
+    while True:
+        job = jobs.get()
+        if job is None:
+            return
+        episode, result, rows, cols, bombs, steps = job
+        if env is None or (env.rows, env.cols) != (rows, cols):
+            env = Minesweeper(rows, cols, w, bomb_limit=len(bombs),
+                              headless=True, verbose=False)
+        board = Board(rows, cols, bombs=bombs)
+        env.set_board(board)
+        frames = []
+        for indices, values in steps:
+            board.revealed[indices] = values <= 9
+            board.flagged[indices] = values == 10
+            env._patch_obs(indices)
+            frames.append(env.render("rgb_array").copy())
+        name = "episode_{:06d}_{}".format(episode, result)
+        if fmt == "gif":
+            from PIL import Image
+            images = [Image.fromarray(frame) for frame in frames]
+            images[0].save(os.path.join(out_dir, name + ".gif"),
+                           save_all=True, append_images=images[1:],
+                           duration=int(1000 / fps), loop=0)
+        else:
+            import pygame
+            path = os.path.join(out_dir, name)
+            os.makedirs(path, exist_ok=True)
+            for n, frame in enumerate(frames):
+                surface = pygame.surfarray.make_surface(frame.swapaxes(0, 1))
+                pygame.image.save(surface,
+                                  os.path.join(path, "{:04d}.png".format(n)))
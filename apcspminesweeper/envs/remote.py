@@ -0,0 +1,369 @@
+"""Minesweeper env server and client.
+
+One server process hosts many headless Minesweeper envs that several
+trainers share over a Unix socket or localhost TCP. Requests arriving in
+the same event-loop tick are handled together and each connection gets its
+responses in a single write.
+
+Wire format (little-endian, fixed-size headers):
+Request:  op uint8, env uint32, a uint32, b uint32, c uint32.
+          OPEN: a, b, c = rows, cols, bomb_limit. STEP: a = action.
+Response: status uint8, env uint32, reward float64, done uint8,
+          length uint32, then length payload bytes. The payload is one
+          observation channel (rows * cols uint8) or an error message.
+
+Run a server with:
+python -m apcspminesweeper.envs.remote --unix /tmp/minesweeper.sock
+
+Set APCSP_MINESWEEPER_SERVER to "unix:/tmp/minesweeper.sock" (or
+"host:port") and gym.make("apcsp-minesweeper-v0") connects to it.
+"""
+import asyncio
+import socket
+import struct
+
+import numpy as np
+from gym import spaces, Env
+
+from .minesweeper import Minesweeper
+
+REQUEST = struct.Struct("<BIIII")
+RESPONSE = struct.Struct("<BIdBI")
+
+OP_OPEN = 0
+OP_RESET = 1
+OP_STEP = 2
+OP_CLOSE = 3
+
+STATUS_OK = 0
+STATUS_ERROR = 1
+
+
+class EnvServer:
+
+    def __init__(self):
+        """
+        Hosts headless Minesweeper envs. Closed envs are kept per
+        configuration and handed out again to later OPEN requests.
+        """
+        self.envs = {}  # env id -> Minesweeper
+        self.owners = {}  # env id -> connection
+        self.configs = {}  # env id -> (rows, cols, bomb_limit)
+        self.free = {}  # (rows, cols, bomb_limit) -> idle envs
+        self._next_id = 0
+        self._pending = []  # (connection, request) tuples of this tick
+        self._flush_scheduled = False
+
+    async def serve_unix(self, path):
+        """
+        Serve on a Unix socket until cancelled.
+        Arguments:
+        path - Socket path.
+        """
+        loop = asyncio.get_running_loop()
+        server = await loop.create_unix_server(
+            lambda: _Connection(self), path)
+        async with server:
+            await server.serve_forever()
+
+    async def serve_tcp(self, host="127.0.0.1", port=8377):
+        """
+        Serve on TCP until cancelled.
+        Arguments:
+        host - Interface to bind, localhost by default.
+        port - Port to bind.
+        """
+        loop = asyncio.get_running_loop()
+        server = await loop.create_server(
+            lambda: _Connection(self), host, port)
+        async with server:
+            await server.serve_forever()
+
+    def submit(self, connection, request):
+        """
+        Queue a request to be handled at the end of this loop tick.
+        Arguments:
+        connection - Connection the request came from.
+        request - Unpacked REQUEST tuple.
+        """
+        self._pending.append((connection, request))
+        if not self._flush_scheduled:
+            self._flush_scheduled = True
+            asyncio.get_running_loop().call_soon(self._flush)
+
+    def _flush(self):
+        """
+        Handle every queued request, then write each connection's responses
+        at once.
+        """
+        pending, self._pending = self._pending, []
+        self._flush_scheduled = False
+        out = {}
+        for connection, request in pending:
+            try:
+                response = self._handle(connection, *request)
+            except Exception as e:  # Report to the client, keep serving
+                response = _pack(STATUS_ERROR, request[1],
+                                 payload=str(e).encode())
+            out.setdefault(connection, []).append(response)
+        for connection, responses in out.items():
+            connection.write(responses)
+
+    def _handle(self, connection, op, env_id, a, b, c):
+        """
+        Handle one request.
+        Returns:
+        Packed response bytes.
+        """
+        if op == OP_OPEN:
+            env_id = self._open(connection, (a, b, c))
+            return _pack(STATUS_OK, env_id,
+                         payload=_channel(self.envs[env_id].reset()))
+        env = self.envs.get(env_id)
+        if env is None or self.owners[env_id] is not connection:
+            raise KeyError("unknown env {}".format(env_id))
+        if op == OP_RESET:
+            return _pack(STATUS_OK, env_id, payload=_channel(env.reset()))
+        if op == OP_STEP:
+            obs, reward, done, _ = env.step(a)
+            return _pack(STATUS_OK, env_id, reward, done, _channel(obs))
+        if op == OP_CLOSE:
+            self.close(env_id)
+            return _pack(STATUS_OK, env_id)
+        raise ValueError("unknown op {}".format(op))
+
+    def _open(self, connection, config):
+        """
+        Take an idle env of the given configuration, or reconfigure an idle
+        env of another one, or create one.
+        Arguments:
+        connection - Connection that will own the env.
+        config - (rows, cols, bomb_limit) tuple.
+        Returns:
+        Env id.
+        """
+        idle = self.free.get(config)
+        other = next((envs for envs in self.free.values() if envs), None)
+        if idle:
+            env = idle.pop()
+        elif other:
+            env = other.pop()
+            rows, cols, bomb_limit = config
+            env.reconfigure(rows, cols, bomb_limit)
+        else:
+            rows, cols, bomb_limit = config
+            env = Minesweeper(rows, cols, 1, bomb_limit=bomb_limit,
+                              headless=True, obs_view=True, verbose=False)
+        env_id = self._next_id
+        self._next_id += 1
+        self.envs[env_id] = env
+        self.owners[env_id] = connection
+        self.configs[env_id] = config
+        return env_id
+
+    def close(self, env_id):
+        """
+        Return an env to the idle pool.
+        Arguments:
+        env_id - Env id.
+        """
+        env = self.envs.pop(env_id)
+        del self.owners[env_id]
+        config = self.configs.pop(env_id)
+        self.free.setdefault(config, []).append(env)
+
+    def drop(self, connection):
+        """
+        Close every env owned by a connection.
+        Arguments:
+        connection - Lost connection.
+        """
+        for env_id in [k for k, v in self.owners.items() if v is connection]:
+            self.close(env_id)
+
+
+class _Connection(asyncio.Protocol):
+
+    def __init__(self, server):
+        self.server = server
+        self.transport = None
+        self.buffer = bytearray()
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def data_received(self, data):
+        self.buffer += data
+        size = REQUEST.size
+        n = len(self.buffer) // size
+        for k in range(n):
+            self.server.submit(self, REQUEST.unpack_from(self.buffer,
+                                                         k * size))
+        del self.buffer[:n * size]
+
+    def connection_lost(self, exc):
+        self.server.drop(self)
+
+    def write(self, responses):
+        if not self.transport.is_closing():
+            self.transport.writelines(responses)
+
+
+def _channel(obs):
+    """
+    Get the bytes of one observation channel (all three are equal).
+    """
+    return obs[:, :, 0].tobytes()
+
+
+def _pack(status, env_id, reward=0.0, done=False, payload=b""):
+    """
+    Pack a response header and payload.
+    """
+    return RESPONSE.pack(status, env_id, reward, done,
+                         len(payload)) + payload
+
+
+def connect(address):
+    """
+    Open a socket to an env server.
+    Arguments:
+    address - "unix:/path/to/socket" or "host:port".
+    Returns:
+    Connected socket.
+    """
+    if address.startswith("unix:"):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.connect(address[len("unix:"):])
+    else:
+        host, port = address.rsplit(":", 1)
+        sock = socket.create_connection((host, int(port)))
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    return sock
+
+
+class RemoteMinesweeper(Env):
+
+    metadata = {"render.modes": []}
+
+    def __init__(self, address, rows=9, cols=9, bomb_limit=10, w=None):
+        """
+        Open an env on an env server. Behaves like a headless Minesweeper.
+        Arguments:
+        address - Server address, see connect().
+        rows - Number of rows.
+        cols - Number of columns.
+        bomb_limit - Amount of bombs.
+        w - Ignored, accepted so gym.make() kwargs can be passed through.
+        """
+        self.rows = rows
+        self.cols = cols
+        self.bomb_limit = bomb_limit
+        self.sock = connect(address)
+        self.action_space = spaces.Discrete(self.cols * self.rows)
+        self.observation_space = spaces.Box(low=0, high=255,
+                                            shape=(self.rows, self.cols, 3))
+        self.env_id = 0
+        self.env_id, _, _, self._first = self._request(OP_OPEN, rows, cols,
+                                                       bomb_limit)
+
+    def _request(self, op, a=0, b=0, c=0):
+        """
+        Send a request and wait for its response.
+        Returns:
+        env id, reward, done, payload - Tuple.
+        """
+        self.sock.sendall(REQUEST.pack(op, self.env_id, a, b, c))
+        status, env_id, reward, done, length = RESPONSE.unpack(
+            self._recv(RESPONSE.size))
+        payload = self._recv(length)
+        if status != STATUS_OK:
+            raise RuntimeError("env server: " + payload.decode())
+        return env_id, reward, bool(done), payload
+
+    def _recv(self, n):
+        """
+        Receive exactly n bytes.
+        """
+        data = bytearray()
+        while len(data) < n:
+            chunk = self.sock.recv(n - len(data))
+            if not chunk:
+                raise ConnectionError("env server closed the connection")
+            data += chunk
+        return bytes(data)
+
+    def _obs(self, payload):
+        """
+        Expand one observation channel to the full observation.
+        """
+        channel = np.frombuffer(payload, dtype=np.uint8)
+        channel = channel.reshape(self.rows, self.cols, 1)
+        return np.repeat(channel, 3, axis=2)
+
+    def reset(self):
+        """
+        Derived from gym.Env.
+        """
+        if self._first is not None:  # OPEN already reset the env
+            payload, self._first = self._first, None
+        else:
+            payload = self._request(OP_RESET)[3]
+        return self._obs(payload)
+
+    def step(self, action):
+        """
+        Derived from gym.Env.
+        Returns:
+        observation, reward, done, info - Tuple.
+        """
+        assert self.action_space.contains(action)
+        self._first = None
+        _, reward, done, payload = self._request(OP_STEP, int(action))
+        return self._obs(payload), reward, done, {}
+
+    def render(self, mode="human"):
+        """
+        Derived from gym.Env. Server envs are headless; nothing to draw.
+        """
+        pass
+
+    def close(self):
+        """
+        Derived from gym.Env. Return the env to the server and disconnect.
+        """
+        if self.sock is not None:
+            try:
+                self._request(OP_CLOSE)
+            finally:
+                self.sock.close()
+                self.sock = None
+
+
+def main():
+    import argparse
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--unix",
+                        help="serve on this Unix socket path")
+    parser.add_argument("--host",
+                        default="127.0.0.1",
+                        help="TCP interface to bind")
+    parser.add_argument("--port",
+                        type=int,
+                        default=8377,
+                        help="TCP port to bind")
+    args = parser.parse_args()
+
+    server = EnvServer()
+    if args.unix:
+        run = server.serve_unix(args.unix)
+    else:
+        run = server.serve_tcp(args.host, args.port)
+    try:
+        asyncio.run(run)
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""Background render thread.
+
+With Minesweeper(render_fps=...) the env never draws itself. draw() only
+publishes a snapshot of the board (copies of the revealed and flagged
+masks) into a single slot, and this thread draws the latest snapshot at a
+fixed rate. Snapshots published in between are dropped, so stepping is
+never held back by the display.
+
+The thread owns the window: it initializes pygame, pumps events and flips
+the display. User input is ignored in this mode, except closing the window.
+"""
+import threading
+
+import numpy as np
+import pygame
+
+from .grid import Grid
+
+
+class RenderThread(threading.Thread):
+
+    def __init__(self, init, w, fps=30, resize=None, view=None):
+        """
+        Arguments:
+        init - Callable that initializes pygame and returns the display
+               surface. Called on the render thread.
+        w - Width of a cell. May be changed along with the board size.
+        fps - Frames drawn per second, at most.
+        resize - Callable that loads the resources for the current cell
+                 width and returns the resized display surface. Called on
+                 the render thread when the board size or w changes.
+        view - Callable making the drawable view of a board (a Grid or
+               Viewport). None makes a Grid.
+        """
+        super().__init__(name="MinesweeperRender", daemon=True)
+        self.init = init
+        self.resize = resize
+        self.view = view
+        self.w = w
+        self.fps = fps
+        self.display = None
+        self.latest = None  # (board, revealed, flagged), replaced whole
+        self.quit_requested = False
+        self.stopped = threading.Event()
+        self.board = None  # Board of the grid being drawn
+        self.grid = None
+        self.revealed = None  # Masks of the last drawn snapshot
+        self.flagged = None
+
+    def publish(self, board):
+        """
+        Publish the current state of a board. Called by the env; cheap.
+        Arguments:
+        board - Board object.
+        """
+        self.latest = (board, board.revealed.copy(), board.flagged.copy())
+
+    def run(self):
+        self.display = self.init()
+        clock = pygame.time.Clock()
+        drawn = None
+        while not self.stopped.is_set():
+            for event in pygame.event.get():
+                if event.type == pygame.QUIT:
+                    self.quit_requested = True
+            snapshot = self.latest
+            if snapshot is not None and snapshot is not drawn:
+                self._draw(*snapshot)
+                drawn = snapshot
+            clock.tick(self.fps)
+        pygame.display.quit()
+
+    def _draw(self, board, revealed, flagged):
+        """
+        Draw a snapshot, syncing only the cells that changed since the last
+        one drawn.
+        """
+        if board is not self.board:
+            if self.grid is not None and self.resize is not None and (
+                    (board.rows, board.cols, self.w)
+                    != (self.board.rows, self.board.cols, self.grid.w)):
+                self.display = self.resize()
+            self.board = board
+            if self.view is not None:
+                self.grid = self.view(board)
+            else:
+                self.grid = Grid(board, self.w)
+            changed = np.arange(board.size)
+        else:
+            changed = np.flatnonzero((revealed != self.revealed)
+                                     | (flagged != self.flagged))
+        self.grid.sync(changed, revealed, flagged)
+        self.revealed = revealed
+        self.flagged = flagged
+        self.grid.update()
+        self.grid.draw(self.display)
+        pygame.display.flip()
+
+    def stop(self):
+        """
+        Stop the thread and close the window.
+        """
+        self.stopped.set()
+        if self.is_alive():
+            self.join()
@@ -0,0 +1,76 @@
+"""Neighbor topology of a board shape.
+
+The neighbors of every cell are stored once per (rows, cols) in CSR form:
+the neighbors of cell k are indices[indptr[k]:indptr[k + 1]]. Topologies
+are cached for the whole process, so boards of the same shape never build
+them again.
+"""
+import numpy as np
+
+_cache = {}  # (rows, cols) -> Topology
+
+
+class Topology:
+
+    def __init__(self, rows, cols):
+        """
+        Build the neighbor arrays. Use topology() to get a cached one.
+        Arguments:
+        rows - Number of rows.
+        cols - Number of columns.
+        """
+        self.rows = rows
+        self.cols = cols
+        self.size = rows * cols
+        j, i = np.divmod(np.arange(self.size), cols)
+        owners = []
+        indices = []
+        for b in range(-1, 2):
+            for a in range(-1, 2):
+                if not (a or b):
+                    continue
+                c = i + a
+                d = j + b
+                valid = (c > -1) & (c < cols) & (d > -1) & (d < rows)
+                owners.append(np.flatnonzero(valid))
+                indices.append(d[valid] * cols + c[valid])
+        owners = np.concatenate(owners)
+        indices = np.concatenate(indices)
+        order = np.argsort(owners, kind="stable")
+        self.owners = owners[order].astype(np.intp)  # Cell of each entry
+        self.indices = indices[order].astype(np.intp)
+        self.indptr = np.zeros(self.size + 1, dtype=np.intp)
+        np.cumsum(np.bincount(self.owners, minlength=self.size),
+                  out=self.indptr[1:])
+        # Python lists for the flood fill, which visits cells one by one
+        self.lists = [self.indices[self.indptr[k]:self.indptr[k + 1]].tolist()
+                      for k in range(self.size)]
+        for array in (self.owners, self.indices, self.indptr):
+            array.flags.writeable = False  # Shared by every board
+
+    def count(self, mask):
+        """
+        Count the neighbors of every cell that are set in a mask.
+        Arguments:
+        mask - Flat boolean array.
+        Returns:
+        Flat int array of counts.
+        """
+        return np.bincount(self.owners, weights=mask[self.indices],
+                           minlength=self.size).astype(np.int8)
+
+
+def topology(rows, cols):
+    """
+    Get the cached topology of a board shape, building it on first use.
+    Arguments:
+    rows - Number of rows.
+    cols - Number of columns.
+    Returns:
+    Topology object.
+    """
+    key = (rows, cols)
+    topo = _cache.get(key)
+    if topo is None:
+        topo = _cache[key] = Topology(rows, cols)
+    return topo
@@ -0,0 +1,282 @@
+"""Scrollable, zoomable view of a board.
+
+A Grid makes a sprite for every cell and draws all of them, so the cost of
+a frame grows with the board and boards larger than the window can't be
+shown. A Viewport keeps no per-cell objects: it draws the cells that
+intersect the window straight from the Board masks, blitting one of a
+dozen tiles (numbers, bomb, flag, covered) prepared per cell size. After
+the first frame only the visible cells that changed are drawn again, until
+the camera moves.
+
+Controls (with Minesweeper(camera=True)):
+    Arrow keys: Scroll by one cell.
+    Middle mouse drag: Scroll.
+    Mouse wheel: Zoom at the mouse position.
+"""
+import numpy as np
+import pygame
+
+from .grid import Grid
+
+COVERED = 11  # Tile of a covered cell, after 0-8, 9 bomb and 10 flag
+BACKGROUND = (0, 0, 0)
+# pygame 2 wheel event; pygame 1 only sends mouse buttons 4 (up) and 5
+MOUSEWHEEL = getattr(pygame, "MOUSEWHEEL", None)
+
+
+def make_tiles(cell, w, font, bomb_img, uncover_img, cover_img, flag_img):
+    """
+    Make the tile of every cell state, looking like Cell sprites.
+    Arguments:
+    cell - Width of the tiles.
+    w - Cell width the images and font were made for.
+    font - Font of the touching counts.
+    bomb_img, uncover_img, cover_img, flag_img - Cell images.
+    Returns:
+    List of surfaces indexed like the observation values, with the covered
+    tile at COVERED.
+    """
+    c = cell
+    scale = c / w
+    uncover = pygame.transform.scale(uncover_img, (c, c))
+    cover = pygame.transform.scale(cover_img, (c, c))
+    tiles = [uncover]
+    for n in range(1, 9):
+        tile = uncover.copy()
+        text = font.render(str(n), True, (255, 0, 0))
+        size = text.get_size()
+        text = pygame.transform.scale(
+            text, (max(1, int(size[0] * scale)),
+                   max(1, int(size[1] * scale))))
+        tile.blit(text, (c * .3, c * .1))
+        tiles.append(tile)
+    tiles.append(pygame.transform.scale(bomb_img, (c, c)))
+    flag = cover.copy()
+    side = max(1, int(flag_img.get_width() * scale))
+    flag.blit(pygame.transform.scale(flag_img, (side, side)), (0, 0))
+    tiles.append(flag)
+    tiles.append(cover)
+    return tiles
+
+
+class Viewport:
+
+    def __init__(self, board, w, width, height, min_w=4, max_w=None):
+        """
+        Arguments:
+        board - Board object to display.
+        w - Width of a cell at zoom 1, as the images were loaded.
+        width - Width of the view in pixels.
+        height - Height of the view in pixels.
+        min_w - Smallest zoomed cell width.
+        max_w - Largest zoomed cell width. None for 4 * w.
+        """
+        self.w = w
+        self.width = width
+        self.height = height
+        self.min_w = min_w
+        self.max_w = 4 * w if max_w is None else max_w
+        self.cell = w  # Current (zoomed) cell width
+        self.x = 0  # Board pixel at the left edge of the view
+        self.y = 0  # Board pixel at the top edge of the view
+        self._tiles = {}  # Cell width -> list of tile surfaces
+        self.board = None
+        self.set_board(board)
+
+    def set_board(self, board):
+        """
+        Display another board, keeping the camera.
+        Arguments:
+        board - Board object.
+        """
+        self.board = board
+        self.revealed = board.revealed
+        self.flagged = board.flagged
+        self.pending = []  # Arrays of changed cell indices to draw
+        self.dirty = True  # Draw every visible cell on the next draw()
+        self._clamp()
+
+    def resize(self, width, height, w=None):
+        """
+        Change the size of the view, and the cell width of the images.
+        Arguments:
+        width - Width of the view in pixels.
+        height - Height of the view in pixels.
+        w - Width of a cell at zoom 1. None keeps the current one.
+        """
+        self.width = width
+        self.height = height
+        if w is not None and w != self.w:
+            self.w = w
+            self.cell = w
+            self.max_w = 4 * w
+            self._tiles = {}
+        self.dirty = True
+        self._clamp()
+
+    def sync(self, indices, revealed=None, flagged=None):
+        """
+        Note cells that changed, to be drawn on the next draw().
+        Arguments:
+        indices - Flat indices of the cells that changed.
+        revealed - Revealed mask to use instead of the board's.
+        flagged - Flagged mask to use instead of the board's.
+        """
+        if revealed is not None:
+            self.revealed = revealed
+        if flagged is not None:
+            self.flagged = flagged
+        if not self.dirty:
+            self.pending.append(np.asarray(indices, dtype=np.intp))
+
+    def update(self):
+        """
+        Nothing to do; the tiles are chosen when drawing. Same interface as
+        Grid.
+        """
+
+    def pan(self, dx, dy):
+        """
+        Move the camera.
+        Arguments:
+        dx - Pixels to the right.
+        dy - Pixels down.
+        """
+        self.x += int(dx)
+        self.y += int(dy)
+        self.dirty = True
+        self._clamp()
+
+    def zoom(self, factor, mx=None, my=None):
+        """
+        Scale the cells, keeping the board point under (mx, my) in place.
+        Arguments:
+        factor - Scale factor, > 1 zooms in.
+        mx - X in the view to zoom at. None for the center.
+        my - Y in the view to zoom at. None for the center.
+        """
+        mx = self.width // 2 if mx is None else mx
+        my = self.height // 2 if my is None else my
+        cell = int(round(self.cell * factor))
+        cell = min(self.max_w, max(self.min_w, cell))
+        if cell == self.cell:
+            return
+        scale = cell / self.cell
+        self.x = int((self.x + mx) * scale) - mx
+        self.y = int((self.y + my) * scale) - my
+        self.cell = cell
+        self.dirty = True
+        self._clamp()
+
+    def _clamp(self):
+        """
+        Keep the camera on the board.
+        """
+        self.x = max(0, min(self.x, self.board.cols * self.cell - self.width))
+        self.y = max(0, min(self.y, self.board.rows * self.cell - self.height))
+
+    def handle_event(self, event):
+        """
+        Move the camera on scroll and zoom input.
+        Arguments:
+        event - pygame event.
+        Returns:
+        True if the event was used.
+        """
+        if MOUSEWHEEL is not None and event.type == MOUSEWHEEL:
+            self.zoom(1.25 ** event.y, *pygame.mouse.get_pos())
+        elif MOUSEWHEEL is None and event.type == pygame.MOUSEBUTTONDOWN \
+                and event.button in (4, 5):
+            self.zoom(1.25 if event.button == 4 else 0.8, *event.pos)
+        elif event.type == pygame.MOUSEMOTION and event.buttons[1]:
+            self.pan(-event.rel[0], -event.rel[1])
+        elif event.type == pygame.KEYDOWN and event.key in ARROWS:
+            dx, dy = ARROWS[event.key]
+            self.pan(dx * self.cell, dy * self.cell)
+        else:
+            return False
+        return True
+
+    def visible(self):
+        """
+        Get the range of cells intersecting the view.
+        Returns:
+        i0, i1, j0, j1 - Visible columns i0 to i1 - 1 and rows j0 to j1 - 1.
+        """
+        c = self.cell
+        i0 = self.x // c
+        j0 = self.y // c
+        i1 = min(self.board.cols, -(-(self.x + self.width) // c))
+        j1 = min(self.board.rows, -(-(self.y + self.height) // c))
+        return i0, i1, j0, j1
+
+    def detect_click(self, mx, my):
+        """
+        Detect click on a cell given click coordinates in the view.
+        Arguments:
+        mx - Mouse X.
+        my - Mouse Y.
+        Returns:
+        Tuple coordinates (i, j) of the clicked cell, or None if outside.
+        """
+        i = (self.x + mx) // self.cell
+        j = (self.y + my) // self.cell
+        if 0 <= i < self.board.cols and 0 <= j < self.board.rows:
+            return i, j
+        return None
+
+    def _tile_set(self):
+        """
+        Get the tiles for the current cell width, making them on first use
+        from the images and font loaded for w.
+        Returns:
+        List of surfaces indexed like the observation values, with the
+        covered tile at COVERED.
+        """
+        tiles = self._tiles.get(self.cell)
+        if tiles is None:
+            tiles = self._tiles[self.cell] = make_tiles(
+                self.cell, self.w, Grid.font, Grid.bomb_img,
+                Grid.uncover_img, Grid.cover_img, Grid.flag_img)
+        return tiles
+
+    def draw(self, surface):
+        """
+        Draw the visible cells: all of them after the camera or board
+        changed, otherwise only the ones that changed since the last draw.
+        Arguments:
+        surface - Surface to draw on, at least the size of the view.
+        """
+        board = self.board
+        i0, i1, j0, j1 = self.visible()
+        if self.dirty:
+            surface.fill(BACKGROUND, (0, 0, self.width, self.height))
+            j, i = np.mgrid[j0:j1, i0:i1]
+            indices = (j * board.cols + i).ravel()
+        elif self.pending:
+            indices = np.concatenate(self.pending)
+            j, i = np.divmod(indices, board.cols)
+            shown = (i >= i0) & (i < i1) & (j >= j0) & (j < j1)
+            indices = indices[shown]
+        else:
+            return
+        self.dirty = False
+        self.pending = []
+        if not len(indices):
+            return
+        revealed = self.revealed[indices]
+        codes = np.where(revealed,
+                         np.where(board.bombs[indices], 9,
+                                  board.touching[indices]),
+                         np.where(self.flagged[indices], 10, COVERED))
+        j, i = np.divmod(indices, board.cols)
+        xs = (i * self.cell - self.x).tolist()
+        ys = (j * self.cell - self.y).tolist()
+        tiles = self._tile_set()
+        surface.blits([(tiles[k], (x, y))
+                       for k, x, y in zip(codes.tolist(), xs, ys)],
+                      doreturn=False)
+
+
+ARROWS = {pygame.K_LEFT: (-1, 0), pygame.K_RIGHT: (1, 0),
+          pygame.K_UP: (0, -1), pygame.K_DOWN: (0, 1)}
@@ -0,0 +1,147 @@
+"""No-guess boards.
+
+A no-guess board can be cleared by logic alone once its start cell (an
+opening) is revealed. They are found by generate-and-test with the solver,
+which is too slow for Minesweeper.reset(), so BoardPool keeps a bounded
+queue of them filled by worker processes.
+"""
+import multiprocessing
+import queue
+
+import numpy as np
+
+from .envs.board import Board
+from .envs.topology import topology
+from .solver import deduce
+
+
+def solvable(board, start):
+    """
+    Check if a board can be cleared without guessing from a start cell.
+    Reveals cells of the given board.
+    Arguments:
+    board - Fresh Board object.
+    start - Flat index of the start cell.
+    Returns:
+    True if every safe cell was revealed by deduction.
+    """
+    board.reveal(start)
+    while board.remaining > 0:
+        safe = deduce(board)[0]
+        if not safe:
+            return False
+        for index in safe:
+            board.reveal(index)
+    return True
+
+
+def max_bombs(rows, cols):
+    """
+    Get the most bombs a no-guess board can have: all cells but the
+    smallest start area (a corner and its neighbors on most boards).
+    Arguments:
+    rows - Number of rows.
+    cols - Number of columns.
+    Returns:
+    Maximum bomb_limit for generate().
+    """
+    return rows * cols - 1 - int(np.diff(topology(rows, cols).indptr).min())
+
+
+def generate(rows, cols, bomb_limit, rng=None, attempts=None):
+    """
+    Generate a no-guess layout. The start cell and its neighbors are kept
+    free of bombs, so revealing the start opens an area.
+    Arguments:
+    rows - Number of rows.
+    cols - Number of columns.
+    bomb_limit - Amount of bombs.
+    rng - np.random.RandomState to use.
+    attempts - Give up after this many layouts. None tries forever.
+    Returns:
+    bombs, start - Array of bomb indices and flat index of the start cell,
+    or None if no layout was found (always if bomb_limit > max_bombs()).
+    """
+    if bomb_limit > max_bombs(rows, cols):
+        return None
+    if rng is None:
+        rng = np.random.RandomState()
+    topo = topology(rows, cols)
+    tried = 0
+    while attempts is None or tried < attempts:
+        tried += 1
+        start = rng.randint(rows * cols)
+        keep_free = np.ones(rows * cols, dtype=bool)
+        keep_free[topo.lists[start]] = False
+        keep_free[start] = False
+        candidates = np.flatnonzero(keep_free)
+        if len(candidates) < bomb_limit:
+            continue  # Start area too big for the bombs, try another
+        bombs = rng.choice(candidates, bomb_limit, replace=False)
+        if solvable(Board(rows, cols, bombs=bombs), start):
+            return bombs.astype(np.int32), start
+    return None
+
+
+def _fill(boards, rows, cols, bomb_limit, seed):
+    """
+    Worker process loop: generate boards until killed. put() blocks while
+    the queue is full, so the pool stays topped up without overshooting.
+    """
+    rng = np.random.RandomState(seed)
+    while True:
+        layout = generate(rows, cols, bomb_limit, rng)
+        if layout is not None:
+            boards.put(layout)
+
+
+class BoardPool:
+
+    def __init__(self, rows, cols, bomb_limit, size=64, processes=1,
+                 seed=None):
+        """
+        Start worker processes generating no-guess boards.
+        Arguments:
+        rows - Number of rows.
+        cols - Number of columns.
+        bomb_limit - Amount of bombs.
+        size - Maximum number of ready boards.
+        processes - Number of worker processes.
+        seed - Base seed of the workers. None for unseeded workers.
+        """
+        assert bomb_limit <= max_bombs(rows, cols), \
+            "no start area fits outside {} bombs".format(bomb_limit)
+        self.rows = rows
+        self.cols = cols
+        self.bomb_limit = bomb_limit
+        self.boards = multiprocessing.Queue(size)
+        self.workers = []
+        for n in range(processes):
+            worker = multiprocessing.Process(
+                target=_fill,
+                args=(self.boards, rows, cols, bomb_limit,
+                      None if seed is None else seed + n),
+                daemon=True)
+            worker.start()
+            self.workers.append(worker)
+
+    def get(self):
+        """
+        Take a ready board without waiting.
+        Returns:
+        bombs, start - See generate(), or None if the pool is empty.
+        """
+        try:
+            return self.boards.get_nowait()
+        except queue.Empty:
+            return None
+
+    def close(self):
+        """
+        Stop the worker processes.
+        """
+        for worker in self.workers:
+            worker.terminate()
+        for worker in self.workers:
+            worker.join()
+        self.workers = []
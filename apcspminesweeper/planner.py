@@ -0,0 +1,223 @@
+"""Monte Carlo planner.
+
+When the solver finds no safe cell, the planner samples many mine layouts
+consistent with what a player can see, and clicks the cell that is safe in
+the most of them, preferring cells likely to open an area (touching no
+bombs). Layouts are sampled by swap moves on all samples at once: the
+samples are stacked arrays of mine and empty cell positions, and a move
+swaps one mine with one empty cell per sample. Samples first anneal
+towards a layout matching every revealed number, then only take moves that
+keep it matching, which samples consistent layouts uniformly.
+
+Sampling stops at a per-move time budget, and can be spread over a
+process pool. If no sample got consistent in time, the solver's estimate
+is used instead.
+"""
+import multiprocessing
+import time
+
+import numpy as np
+
+from . import solver
+
+EVALUATE_SHARE = 0.2  # Part of the budget kept for evaluating the samples
+
+
+def _constraints(board, mines, constraints):
+    """
+    Build the arrays the sampler works on.
+    Arguments:
+    board - Board object.
+    mines - Set of known mines.
+    constraints - Remaining constraints from solver.deduce().
+    Returns:
+    unknown, links, weights, target, edges, blocked - Flat indices of
+    the covered cells that are not known mines; per unknown cell the ids of
+    its constraints padded with a dummy id, and 1 for real ids, 0 for pads;
+    mines per constraint (the dummy last); (owners, neighbors) positions in
+    unknown of each pair of neighboring unknown cells, from the board's
+    topology; unknown cells next to a known mine.
+    """
+    unknown = np.array(sorted(set(np.flatnonzero(~board.revealed)) - mines),
+                       dtype=np.intp)
+    position = np.full(board.size, -1, dtype=np.intp)
+    position[unknown] = np.arange(len(unknown))
+    links = [[] for _ in unknown]
+    for c, (cells, n) in enumerate(constraints):
+        for cell in cells:
+            links[position[cell]].append(c)
+    width = max([len(l) for l in links] + [1])
+    dummy = len(constraints)
+    weights = np.zeros((len(unknown), width), dtype=np.int16)
+    padded = np.full((len(unknown), width), dummy, dtype=np.intp)
+    for u, l in enumerate(links):
+        padded[u, :len(l)] = l
+        weights[u, :len(l)] = 1
+    target = np.array([n for cells, n in constraints] + [0], dtype=np.int16)
+
+    topo = board.topology
+    owners = position[topo.owners]
+    neighbors = position[topo.indices]
+    inside = (owners >= 0) & (neighbors >= 0)
+    edges = owners[inside], neighbors[inside]
+    known = np.zeros(board.size, dtype=bool)
+    known[list(mines)] = True
+    blocked = topo.count(known)[unknown] > 0
+    return unknown, padded, weights, target, edges, blocked
+
+
+def sample(links, weights, target, mines_left, samples, deadline, rng,
+           temperature=0.5, mix=200):
+    """
+    Sample layouts of the unknown cells that match the constraints.
+    Arguments:
+    links, weights, target - See _constraints().
+    mines_left - Mines among the unknown cells, 0 < mines_left < unknown.
+    samples - Number of layouts sampled together.
+    deadline - time.perf_counter() value to stop at.
+    rng - np.random.RandomState to use.
+    temperature - Annealing temperature of inconsistent samples.
+    mix - Moves made after every sample got consistent.
+    Returns:
+    Bool array (consistent samples, unknown cells) of mine layouts.
+    """
+    count = len(links)
+    rows = np.arange(samples)
+    # Random initial layouts: mine and empty positions per sample
+    order = np.argsort(rng.random_sample((samples, count)), axis=1)
+    mine_at = order[:, :mines_left]
+    empty_at = order[:, mines_left:]
+    counts = np.zeros((samples, len(target)), dtype=np.int16)
+    for k in range(mines_left):
+        np.add.at(counts, (rows[:, None], links[mine_at[:, k]]),
+                  weights[mine_at[:, k]])
+    energy = np.abs(counts - target).sum(axis=1)
+    if len(target) == 1:  # No constraints: the random layouts are exact
+        mix = 0
+    mixed = 0
+    while mixed < mix and time.perf_counter() < deadline:
+        a = rng.randint(mines_left, size=samples)
+        b = rng.randint(count - mines_left, size=samples)
+        old = mine_at[rows, a]
+        new = empty_at[rows, b]
+        # Constraints of both cells are unchanged by the swap
+        old_links = links[old]
+        new_links = links[new]
+        shared = old_links[:, :, None] == new_links[:, None, :]
+        old_delta = -weights[old] * ~shared.any(axis=2)
+        new_delta = weights[new] * ~shared.any(axis=1)
+        index = np.concatenate((old_links, new_links), axis=1)
+        delta = np.concatenate((old_delta, new_delta), axis=1)
+        before = counts[rows[:, None], index] - target[index]
+        change = (np.abs(before + delta) - np.abs(before)).sum(axis=1)
+        # Consistent samples only take moves keeping them consistent,
+        # the others sometimes take worse moves too
+        accept = change <= 0
+        hot = energy > 0
+        accept[hot] |= rng.random_sample(np.count_nonzero(hot)) \
+            < np.exp(-change[hot] / temperature)
+        r = rows[accept]
+        counts[r[:, None], index[accept]] += delta[accept]
+        energy[accept] += change[accept]
+        mine_at[r, a[accept]] = new[accept]
+        empty_at[r, b[accept]] = old[accept]
+        if not energy.any():
+            mixed += 1
+    valid = energy == 0
+    layouts = np.zeros((np.count_nonzero(valid), count), dtype=bool)
+    layouts[np.arange(len(layouts))[:, None], mine_at[valid]] = True
+    return layouts
+
+
+def _simulate(job):
+    """
+    Sample layouts and sum, per unknown cell, the layouts where it is a
+    mine and where it would open an area. Run in a worker process or
+    directly.
+    Arguments:
+    job - (links, weights, target, edges, blocked, mines_left, samples,
+          seconds, seed) tuple.
+    Returns:
+    layouts, mine, zero - Consistent layouts sampled and the two sums.
+    """
+    (links, weights, target, edges, blocked, mines_left, samples,
+     seconds, seed) = job
+    deadline = time.perf_counter() + seconds
+    layouts = sample(links, weights, target, mines_left, samples, deadline,
+                     np.random.RandomState(seed))
+    # Cells with a mine around, per layout, from the mines' edges only
+    owners, neighbors = edges
+    s, e = np.nonzero(layouts[:, neighbors])
+    touched = np.zeros_like(layouts)
+    touched[s, owners[e]] = True
+    zero = (~layouts & ~touched).sum(axis=0) * ~blocked
+    return len(layouts), layouts.sum(axis=0), zero
+
+
+class MonteCarloPlanner:
+
+    def __init__(self, budget=0.1, samples=256, processes=1, progress=0.02,
+                 seed=None):
+        """
+        Arguments:
+        budget - Seconds to spend per move, at most (roughly).
+        samples - Layouts sampled per move, split over the processes.
+        processes - Worker processes to sample in. 1 samples in this one.
+        progress - Weight of the chance to open an area against the chance
+                   to be safe.
+        seed - Seed of the sampling. None for unseeded sampling.
+        """
+        self.budget = budget
+        self.samples = samples
+        self.processes = processes
+        self.progress = progress
+        self.rng = np.random.RandomState(seed)
+        self.pool = None
+        if processes > 1:
+            self.pool = multiprocessing.Pool(processes)
+
+    def choose(self, board):
+        """
+        Choose the next cell to click.
+        Arguments:
+        board - Board object.
+        Returns:
+        index, certain - Flat cell index and whether it is known to be safe.
+        """
+        start = time.perf_counter()
+        safe, mines, constraints = solver.deduce(board)
+        if safe:
+            return min(safe), True
+        unknown, links, weights, target, edges, blocked = \
+            _constraints(board, mines, constraints)
+        mines_left = board.total_bombs - len(mines)
+        if not 0 < mines_left < len(unknown):
+            return solver.choose(board, self.rng)
+
+        seconds = (start + self.budget * (1 - EVALUATE_SHARE)
+                   - time.perf_counter())
+        parts = self.processes if self.pool is not None else 1
+        jobs = [(links, weights, target, edges, blocked, mines_left,
+                 max(1, self.samples // parts), seconds, seed)
+                for seed in self.rng.randint(2 ** 31, size=parts)]
+        if self.pool is None:
+            results = [_simulate(jobs[0])]
+        else:
+            results = self.pool.map(_simulate, jobs)
+        total = sum(r[0] for r in results)
+        if total == 0:  # Out of time before any layout matched
+            return solver.choose(board, self.rng)
+        mine = sum(r[1] for r in results) / total
+        zero = sum(r[2] for r in results) / total
+        score = 1 - mine + self.progress * zero
+        best = np.flatnonzero(score == score.max())
+        return int(unknown[best[self.rng.randint(len(best))]]), False
+
+    def close(self):
+        """
+        Stop the worker processes.
+        """
+        if self.pool is not None:
+            self.pool.close()
+            self.pool.join()
+            self.pool = None
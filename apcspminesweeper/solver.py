@@ -0,0 +1,118 @@
+"""Logic solver.
+
+Deduces safe cells and mines from what a player can see of a Board: the
+revealed cells, their touching counts and the total amount of bombs. Bombs
+are only looked at once revealed.
+"""
+import numpy as np
+
+
+def deduce(board):
+    """
+    Find the cells that are certainly safe or certainly mines, using the
+    single cell rule and the subset rule on the revealed numbers.
+    Arguments:
+    board - Board object.
+    Returns:
+    safe, mines, constraints - Sets of flat indices of unrevealed safe cells
+    and mines, and the list of remaining (cells set, mines left) constraints.
+    """
+    revealed = board.revealed
+    safe = set()
+    mines = set()
+    constraints = []
+    # Revealed numbers with covered neighbors; a revealed bomb means the
+    # game is already lost
+    covered = board.topology.count(~revealed)
+    for k in np.flatnonzero(revealed & (covered > 0) & ~board.bombs):
+        cells = {n for n in board.neighbors(k) if not revealed[n]}
+        constraints.append((cells, int(board.touching[k])))
+
+    changed = True
+    while changed:
+        changed = False
+        reduced = []
+        for cells, n in constraints:
+            n -= len(cells & mines)
+            cells = cells - mines - safe
+            if not cells:
+                continue
+            if n == 0:
+                safe |= cells
+                changed = True
+            elif n == len(cells):
+                mines |= cells
+                changed = True
+            else:
+                reduced.append((cells, n))
+        constraints = reduced
+        if changed:
+            continue
+        # Subset rule: if A is within B, B - A holds the difference of mines
+        for a, a_n in constraints:
+            for b, b_n in constraints:
+                if a < b:
+                    rest = b - a
+                    if a_n == b_n:
+                        safe |= rest
+                        changed = True
+                    elif b_n - a_n == len(rest):
+                        mines |= rest
+                        changed = True
+
+    # Every mine found: all other covered cells are safe
+    if len(mines) == board.total_bombs:
+        safe |= set(np.flatnonzero(~revealed)) - mines
+    return safe, mines, constraints
+
+
+def probabilities(board, mines, constraints):
+    """
+    Estimate the mine probability of every covered cell that is not a known
+    mine. Cells in a constraint get the highest density among their
+    constraints, all others the density of the unconstrained remainder.
+    Arguments:
+    board - Board object.
+    mines - Set of known mines.
+    constraints - Remaining constraints from deduce().
+    Returns:
+    Dict of flat index to probability.
+    """
+    covered = set(np.flatnonzero(~board.revealed)) - mines
+    if not covered:
+        return {}
+    prob = {}
+    for cells, n in constraints:
+        p = n / len(cells)
+        for c in cells:
+            prob[c] = max(prob.get(c, 0.0), p)
+    left = board.total_bombs - len(mines)
+    expected = sum(prob.values())
+    free = len(covered) - len(prob)
+    density = min(1.0, max(0.0, left - expected) / free) if free else 1.0
+    for c in covered:
+        prob.setdefault(c, density)
+    return prob
+
+
+def choose(board, rng=None):
+    """
+    Choose the next cell to click: a known safe cell if there is one,
+    otherwise the covered cell least likely to be a mine.
+    Arguments:
+    board - Board object.
+    rng - np.random.RandomState used to break ties.
+    Returns:
+    index, certain - Flat cell index and whether it is known to be safe.
+    """
+    safe, mines, constraints = deduce(board)
+    if safe:
+        return min(safe), True
+    prob = probabilities(board, mines, constraints)
+    if not prob:  # Only mines left covered
+        return int(np.flatnonzero(~board.revealed)[0]), False
+    best = min(prob.values())
+    candidates = sorted(c for c, p in prob.items() if p == best)
+    if rng is None:
+        rng = np.random
+    return int(candidates[rng.randint(len(candidates))]), False
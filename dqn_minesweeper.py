@@ -4,52 +4,174 @@ from keras.models import Model
 from keras.layers import Dense, Input, Flatten, Conv2D, MaxPooling2D, Reshape
 from keras.optimizers import Adam
 from rl.agents.dqn import DQNAgent
+from rl.callbacks import Callback
 from rl.policy import BoltzmannQPolicy
-from rl.memory import SequentialMemory
+from rl.memory import Experience, SequentialMemory
 import gym
 
 import apcspminesweeper  # NOQA
+from apcspminesweeper.augment import Dihedral
 
 ENV_NAME = "apcsp-minesweeper-v0"
 
 
+def build_model(env, filters=18, hidden=18):
+    """
+    Build the Q network for a Minesweeper env.
+    Arguments:
+    env - Minesweeper env (or a wrapper of one).
+    filters - Filters of the convolution layer.
+    hidden - Units of the hidden dense layer.
+    Returns:
+    Keras model, input (1, rows, cols, 3) and one output per action.
+    """
+    nb_actions = env.action_space.n
+    # self.model.add(Input((self.env.rows, self.env.cols, 3)))
+    inp = Input(shape=(1,) + env.observation_space.shape)
+    flat0 = Reshape((env.rows, env.cols, 3))(inp)
+    conv1 = Conv2D(filters, 3,
+                   activation="relu",
+                   data_format="channels_last")(flat0)
+    #pool1 = MaxPooling2D()(conv1)
+    #conv2 = Conv2D(18, 2, activation="relu")(pool1)
+    #pool2 = MaxPooling2D()(conv2)
+    #conv3 = Conv2D(32, 2, activation="relu")(pool2)
+    flat = Flatten()(conv1)
+    hidden1 = Dense(hidden)(flat)
+    out = Dense(nb_actions, activation="linear")(hidden1)
+    return Model(inputs=inp, outputs=out)
+
+
+class DihedralMemory(SequentialMemory):
+    """
+    Replay memory that rotates or mirrors every sampled transition by a
+    random board symmetry, so each stored step trains as up to 8.
+    """
+
+    def __init__(self, rows, cols, *args, **kwargs):
+        """
+        Arguments:
+        rows - Number of rows.
+        cols - Number of columns.
+        Other arguments are passed to SequentialMemory.
+        """
+        super().__init__(*args, **kwargs)
+        self.dihedral = Dihedral(rows, cols)
+
+    def sample(self, batch_size, batch_idxs=None):
+        apply = self.dihedral.apply
+        experiences = super().sample(batch_size, batch_idxs)
+        transforms = self.dihedral.sample(len(experiences))
+        return [Experience(state0=[apply(obs, k) for obs in e.state0],
+                           action=self.dihedral.action(e.action, k),
+                           reward=e.reward,
+                           state1=[apply(obs, k) for obs in e.state1],
+                           terminal1=e.terminal1)
+                for e, k in zip(experiences, transforms)]
+
+
+class StopTraining(Exception):
+    """
+    Raised by a callback to end DQNMinesweeperPlayer.train() early.
+    """
+
+
+class EveryCallback(Callback):
+    """
+    keras-rl callback calling a function every n training steps, i.e. to
+    evaluate during one fit() instead of calling fit() again, which would
+    restart the step count and the warmup.
+    """
+
+    def __init__(self, every, function):
+        """
+        Arguments:
+        every - Training steps between calls.
+        function - Callable given the steps trained so far. Training stops
+                   (StopTraining is raised) when it returns False.
+        """
+        super().__init__()
+        self.every = every
+        self.function = function
+        self.steps = 0  # Counted here: the agent's step is an np.int16
+
+    def on_step_end(self, step, logs={}):
+        self.steps += 1
+        if self.steps % self.every == 0 and not self.function(self.steps):
+            raise StopTraining()
+
+
 class DQNMinesweeperPlayer:
 
-    def __init__(self):
-        self.env = gym.make(ENV_NAME)
+    def __init__(self, env=None, filters=18, hidden=18, memory_limit=18000,
+                 warmup=81, lr=1e-3, target_model_update=1e-2,
+                 augment=False, verbose=True):
+        """
+        Build the agent. The defaults are the original settings; see
+        sweep_dqn.py for searching them.
+        Arguments:
+        env - Env to train on. None makes ENV_NAME.
+        filters - Filters of the convolution layer.
+        hidden - Units of the hidden dense layer.
+        memory_limit - Transitions kept in the replay memory.
+        warmup - Steps before training starts.
+        lr - Adam learning rate.
+        target_model_update - Soft update rate of the target network.
+        augment - Train on random rotations and reflections of the sampled
+                  transitions (see DihedralMemory).
+        verbose - Print the model summary.
+        """
+        self.env = gym.make(ENV_NAME) if env is None else env
 
         nb_actions = self.env.action_space.n
-        # self.model.add(Input((self.env.rows, self.env.cols, 3)))
-        inp = Input(shape=(1,) + self.env.observation_space.shape)
-        flat0 = Reshape((self.env.rows, self.env.cols, 3))(inp)
-        conv1 = Conv2D(18, 3,
-                       activation="relu",
-                       data_format="channels_last")(flat0)
-        #pool1 = MaxPooling2D()(conv1)
-        #conv2 = Conv2D(18, 2, activation="relu")(pool1)
-        #pool2 = MaxPooling2D()(conv2)
-        #conv3 = Conv2D(32, 2, activation="relu")(pool2)
-        flat = Flatten()(conv1)
-        hidden1 = Dense(18)(flat)
-        out = Dense(nb_actions, activation="linear")(hidden1)
-        self.model = Model(inputs=inp, outputs=out)
-        print(self.model.summary())
-
-        self.mem = SequentialMemory(limit=18000, window_length=1)
+        self.model = build_model(self.env, filters, hidden)
+        if verbose:
+            print(self.model.summary())
+
+        if augment:
+            env = self.env.unwrapped
+            self.mem = DihedralMemory(env.rows, env.cols,
+                                      limit=memory_limit, window_length=1)
+        else:
+            self.mem = SequentialMemory(limit=memory_limit, window_length=1)
         self.policy = BoltzmannQPolicy()
         self.agent = DQNAgent(model=self.model,
                               nb_actions=nb_actions,
                               memory=self.mem,
-                              nb_steps_warmup=81,
-                              target_model_update=1e-2,
+                              nb_steps_warmup=warmup,
+                              target_model_update=target_model_update,
                               policy=self.policy)
-        self.agent.compile(Adam(lr=1e-3), metrics=["mae"])
-        self.agent.fit(self.env, nb_steps=500000, visualize=True, verbose=2,
-                       action_repetition=100)
+        self.agent.compile(Adam(lr=lr), metrics=["mae"])
+
+    def train(self, nb_steps=500000, visualize=True, verbose=2,
+              action_repetition=100, callbacks=None):
+        """
+        Train the agent. Memory and weights are kept between calls, but each
+        call starts the warmup again.
+        Arguments:
+        nb_steps - Env steps to train for.
+        visualize - Render while training.
+        verbose - keras-rl logging level.
+        action_repetition - Times each chosen action is repeated. The
+                            default is the original setting; a repeated
+                            click hits a revealed cell and ends the episode,
+                            so use 1 to learn from whole games.
+        callbacks - keras-rl callbacks, i.e. EveryCallback.
+        """
+        self.agent.fit(self.env, nb_steps=nb_steps, visualize=visualize,
+                       verbose=verbose, action_repetition=action_repetition,
+                       callbacks=callbacks)
+
+    def run(self):
+        """
+        Train with the original settings, save the weights and show a few
+        test games.
+        """
+        self.train()
         self.agent.save_weights("dqn_{}_weights.h5".format(ENV_NAME),
                                 overwrite=True)
         self.agent.test(nb_episodes=5, visualize=True)
 
 
 if __name__ == "__main__":
-    DQNMinesweeperPlayer()
+    DQNMinesweeperPlayer().run()
@@ -0,0 +1,232 @@
+"""Evaluate a Minesweeper policy over many seeded boards.
+
+Games are played headless across a process pool. Game k is played on the
+board seeded with seed + k, so runs with the same seed are comparable
+between policies.
+
+Policies:
+    random: Click a random covered cell.
+    solver: Click a safe cell found by apcspminesweeper.solver, guess the
+            least likely mine otherwise.
+    planner: Like solver, but guesses by sampling consistent mine layouts
+             with apcspminesweeper.planner (--budget seconds per move).
+    dqn:    Greedy policy of a DQN trained by dqn_minesweeper.py (--weights).
+
+i.e. `python evaluate_minesweeper.py --policy solver --games 100000`
+"""
+import argparse
+import math
+import multiprocessing
+import os
+import time
+
+import numpy as np
+
+from apcspminesweeper import planner, solver
+from apcspminesweeper.envs.minesweeper import Minesweeper
+
+
+class RandomPolicy:
+
+    def __init__(self, env, seed, weights=None, budget=None):
+        self.rng = np.random.RandomState(seed)
+
+    def __call__(self, env, obs):
+        return int(self.rng.choice(np.flatnonzero(~env.board.revealed)))
+
+
+class SolverPolicy:
+
+    def __init__(self, env, seed, weights=None, budget=None):
+        self.rng = np.random.RandomState(seed)
+
+    def __call__(self, env, obs):
+        return solver.choose(env.board, self.rng)[0]
+
+
+class PlannerPolicy:
+
+    def __init__(self, env, seed, weights=None, budget=None):
+        self.planner = planner.MonteCarloPlanner(budget=budget or 0.1,
+                                                 seed=seed)
+
+    def __call__(self, env, obs):
+        return self.planner.choose(env.board)[0]
+
+
+class DQNPolicy:
+
+    def __init__(self, env, seed, weights=None, budget=None, model=None):
+        if model is None:
+            assert weights is not None, "dqn policy needs --weights"
+            from dqn_minesweeper import build_model
+            model = build_model(env)
+            model.load_weights(weights)
+        self.model = model
+
+    def __call__(self, env, obs):
+        q = self.model.predict_on_batch(obs[np.newaxis, np.newaxis])
+        return int(np.argmax(q[0]))
+
+
+POLICIES = {"random": RandomPolicy,
+            "solver": SolverPolicy,
+            "planner": PlannerPolicy,
+            "dqn": DQNPolicy}
+
+
+def play(job):
+    """
+    Play a range of seeded games. Run in a worker process.
+    Arguments:
+    job - (policy, weights, budget, rows, cols, bombs, first seed, games)
+          tuple.
+    Returns:
+    Array of games, wins, losses, invalid (revealed cell clicked) and
+    clicks totals.
+    """
+    name, weights, budget, rows, cols, bombs, first, count = job
+    env = Minesweeper(rows, cols, 1, bomb_limit=bombs, headless=True,
+                      obs_view=True, verbose=False)
+    policy = POLICIES[name](env, first, weights, budget)
+    return play_games(env, policy, first, count)
+
+
+def play_games(env, policy, first, count):
+    """
+    Play a range of seeded games with a policy.
+    Arguments:
+    env - Headless Minesweeper env.
+    policy - Callable (env, obs) -> action.
+    first - Seed of the first game.
+    count - Number of games.
+    Returns:
+    Array of games, wins, losses, invalid and clicks totals, see play().
+    """
+    totals = np.zeros(5, dtype=np.int64)
+    for seed in range(first, first + count):
+        obs = env.reset(seed=seed)
+        done = False
+        while not done:
+            obs, reward, done, _ = env.step(policy(env, obs))
+        totals += (1, env.end and not env.lost, env.lost, not env.end,
+                   env.clicks)
+    return totals
+
+
+def wilson(successes, n, z=1.96):
+    """
+    Wilson score interval of a binomial proportion.
+    Arguments:
+    successes - Number of successes.
+    n - Number of trials.
+    z - Normal quantile, 1.96 for 95%.
+    Returns:
+    Tuple (low, high).
+    """
+    if n == 0:
+        return 0.0, 1.0
+    p = successes / n
+    center = (p + z * z / (2 * n)) / (1 + z * z / n)
+    half = z * math.sqrt(p * (1 - p) / n + z * z / (4 * n * n)) \
+        / (1 + z * z / n)
+    return center - half, center + half
+
+
+def evaluate(policy="solver", games=10000, rows=9, cols=9, bombs=10,
+             seed=0, workers=None, chunk=500, weights=None, budget=None):
+    """
+    Play games over a process pool and summarize them.
+    Arguments:
+    policy - Key of POLICIES.
+    games - Number of games.
+    rows - Number of rows.
+    cols - Number of columns.
+    bombs - Amount of bombs.
+    seed - Seed of the first board.
+    workers - Worker processes, all cores if None.
+    chunk - Games per job.
+    weights - DQN weights file, dqn policy only.
+    budget - Seconds per move, planner policy only.
+    Returns:
+    Dict of results.
+    """
+    jobs = [(policy, weights, budget, rows, cols, bombs, s,
+             min(chunk, seed + games - s))
+            for s in range(seed, seed + games, chunk)]
+    start = time.perf_counter()
+    totals = np.zeros(5, dtype=np.int64)
+    with multiprocessing.Pool(workers) as pool:
+        for result in pool.imap_unordered(play, jobs):
+            totals += result
+    elapsed = time.perf_counter() - start
+    n, wins, losses, invalid, clicks = (int(t) for t in totals)
+    return {"games": n,
+            "wins": wins,
+            "losses": losses,
+            "invalid": invalid,
+            "win_rate": wins / n,
+            "win_rate_ci95": wilson(wins, n),
+            "mean_clicks": clicks / n,
+            "seconds": elapsed,
+            "games_per_second": n / elapsed}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--policy",
+                        choices=sorted(POLICIES),
+                        default="solver",
+                        help="policy to evaluate")
+    parser.add_argument("--weights",
+                        help="DQN weights file for the dqn policy")
+    parser.add_argument("--budget",
+                        type=float,
+                        default=0.1,
+                        help="seconds per move for the planner policy")
+    parser.add_argument("--games",
+                        type=int,
+                        default=10000,
+                        help="number of games")
+    parser.add_argument("--griddim",
+                        nargs=2,
+                        type=int,
+                        metavar=("ROWS", "COLS"),
+                        default=[9, 9],
+                        help="set grid dimensions")
+    parser.add_argument("--bombs",
+                        type=int,
+                        default=10,
+                        help="set bomb_limit")
+    parser.add_argument("--seed",
+                        type=int,
+                        default=0,
+                        help="seed of the first board")
+    parser.add_argument("--workers",
+                        type=int,
+                        default=os.cpu_count(),
+                        help="worker processes")
+    parser.add_argument("--chunk",
+                        type=int,
+                        default=500,
+                        help="games per job")
+    args = parser.parse_args()
+
+    r = evaluate(args.policy, args.games, args.griddim[0], args.griddim[1],
+                 args.bombs, args.seed, args.workers, args.chunk,
+                 args.weights, args.budget)
+    low, high = r["win_rate_ci95"]
+    print("Policy: {}, {} games on {}x{} with {} bombs".format(
+        args.policy, r["games"], args.griddim[0], args.griddim[1],
+        args.bombs))
+    print("Win rate: {:.4f} (95% CI {:.4f} - {:.4f})".format(
+        r["win_rate"], low, high))
+    print("Wins: {}, losses: {}, invalid clicks: {}".format(
+        r["wins"], r["losses"], r["invalid"]))
+    print("Mean clicks: {:.2f}".format(r["mean_clicks"]))
+    print("Throughput: {:.0f} games/s ({:.1f} s)".format(
+        r["games_per_second"], r["seconds"]))
+
+
+if __name__ == "__main__":
+    main()
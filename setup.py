@@ -3,4 +3,6 @@ from setuptools import setup
 
 setup(name="apcsp-minesweeper",
       version="0.0.1",
-      install_requires=["gym", "pygame"])
+      python_requires=">=3.7",  # Module __getattr__, asyncio.run
+      install_requires=["gym", "pygame>=1.9.4", "numpy"],
+      entry_points={"gym.envs": ["__root__ = apcspminesweeper:register"]})
@@ -0,0 +1,300 @@
+"""Hyperparameter sweep for the DQN of dqn_minesweeper.py.
+
+Trials train headless in a process pool, one trial per worker process and
+one compute thread per trial. A trial trains in one keras-rl fit(), without
+action repetition, and is evaluated every --rung steps: its greedy policy
+plays --eval-games seeded boards (as in evaluate_minesweeper.py). A trial
+whose win rate at a rung is below the --stop-quantile of the win rates of
+the trials that reached that rung is stopped early. The results of all
+trials are written to one CSV table, best first.
+
+The search space is a JSON object mapping the parameters of
+DQNMinesweeperPlayer (filters, hidden, memory_limit, warmup, lr,
+target_model_update, augment) and nb_steps to a list of values, or, for random
+search only, to {"low": a, "high": b, "log": true/false, "int": true/false}.
+
+i.e. `python sweep_dqn.py --search random --trials 32 --space space.json`
+"""
+import argparse
+import csv
+import itertools
+import json
+import multiprocessing
+import os
+import time
+
+import numpy as np
+
+# Parameters searched when no --space is given (96 grid points)
+DEFAULT_SPACE = {"filters": [18, 32],
+                 "hidden": [18, 64],
+                 "memory_limit": [18000, 100000],
+                 "warmup": [81, 1000],
+                 "lr": [1e-4, 1e-3, 1e-2],
+                 "target_model_update": [1e-2, 1e-3],
+                 "nb_steps": [100000]}
+
+
+def grid(space):
+    """
+    List every combination of a search space.
+    Arguments:
+    space - Dict of parameter to list of values.
+    Returns:
+    List of parameter dicts.
+    """
+    for name, values in space.items():
+        assert isinstance(values, list), \
+            "grid search needs a list of values for " + name
+    names = sorted(space)
+    return [dict(zip(names, values))
+            for values in itertools.product(*(space[n] for n in names))]
+
+
+def sample(space, trials, rng):
+    """
+    Draw random points of a search space.
+    Arguments:
+    space - Dict of parameter to list of values or range dict.
+    trials - Number of points.
+    rng - np.random.RandomState to use.
+    Returns:
+    List of parameter dicts.
+    """
+    points = []
+    for _ in range(trials):
+        point = {}
+        for name in sorted(space):
+            values = space[name]
+            if isinstance(values, list):
+                value = values[rng.randint(len(values))]
+            elif values.get("log"):
+                value = float(np.exp(rng.uniform(np.log(values["low"]),
+                                                 np.log(values["high"]))))
+            else:
+                value = float(rng.uniform(values["low"], values["high"]))
+            if isinstance(values, dict) and values.get("int"):
+                value = int(round(value))
+            point[name] = value
+        points.append(point)
+    return points
+
+
+def _init_worker():
+    """
+    Limit a worker to one compute thread, before TensorFlow is imported.
+    """
+    for name in ("OMP_NUM_THREADS", "MKL_NUM_THREADS",
+                 "TF_NUM_INTRAOP_THREADS", "TF_NUM_INTEROP_THREADS"):
+        os.environ[name] = "1"
+    os.environ.setdefault("TF_CPP_MIN_LOG_LEVEL", "2")
+
+
+def run_trial(job):
+    """
+    Train and evaluate one trial, stopping early if it falls behind. Run in
+    a worker process.
+    Arguments:
+    job - (trial number, parameters, settings dict, shared rung scores
+          dict, lock) tuple.
+    Returns:
+    Dict of the trial's parameters and results.
+    """
+    from apcspminesweeper.envs.minesweeper import Minesweeper
+    from dqn_minesweeper import DQNMinesweeperPlayer, EveryCallback, \
+        StopTraining
+    from evaluate_minesweeper import DQNPolicy, play_games
+
+    trial, params, settings, rungs, lock = job
+    start = time.perf_counter()
+    params = dict(params)
+    nb_steps = int(params.pop("nb_steps", 100000))
+    rows, cols, bombs = settings["rows"], settings["cols"], settings["bombs"]
+    env = Minesweeper(rows, cols, 1, bomb_limit=bombs, headless=True,
+                      verbose=False)
+    player = DQNMinesweeperPlayer(env, verbose=False, **params)
+    # Evaluated on its own env; the greedy policy shares the live model
+    eval_env = Minesweeper(rows, cols, 1, bomb_limit=bombs, headless=True,
+                           obs_view=True, verbose=False)
+    policy = DQNPolicy(eval_env, settings["seed"], model=player.model)
+    weights = os.path.join(settings["out_dir"],
+                           "trial_{:04d}_weights.h5".format(trial))
+    last = {"steps": 0}  # Latest evaluation
+
+    def evaluate(steps):
+        """
+        Save and evaluate the weights at a rung.
+        Returns:
+        False if the trial fell behind the other trials at this rung.
+        """
+        player.agent.save_weights(weights, overwrite=True)
+        games, wins, losses, invalid, clicks = play_games(
+            eval_env, policy, settings["seed"], settings["eval_games"])
+        last.update(steps=steps, win_rate=wins / games,
+                    invalid_rate=invalid / games, mean_clicks=clicks / games)
+        with lock:
+            scores = rungs.get(steps, []) + [wins / games]
+            rungs[steps] = scores
+        return steps >= nb_steps or len(scores) <= settings["min_peers"] \
+            or wins / games >= np.quantile(scores, settings["stop_quantile"])
+
+    # One fit() for the whole trial, so the warmup happens once
+    stopped = False
+    try:
+        player.train(nb_steps, visualize=False, verbose=0,
+                     action_repetition=1,
+                     callbacks=[EveryCallback(settings["rung"], evaluate)])
+    except StopTraining:
+        stopped = True
+    if not stopped and last["steps"] < nb_steps:
+        evaluate(nb_steps)  # Last, partial rung
+    result = {"trial": trial}
+    result.update(params)
+    result.update({"nb_steps": nb_steps,
+                   "steps": last["steps"],
+                   "stopped": stopped,
+                   "win_rate": last["win_rate"],
+                   "invalid_rate": last["invalid_rate"],
+                   "mean_clicks": last["mean_clicks"],
+                   "seconds": time.perf_counter() - start})
+    return result
+
+
+def sweep(points, rows=9, cols=9, bombs=10, rung=10000, eval_games=200,
+          seed=0, stop_quantile=0.25, min_peers=3, workers=None,
+          out_dir="sweep", progress=None):
+    """
+    Run trials over a process pool.
+    Arguments:
+    points - List of parameter dicts, from grid() or sample().
+    rows - Number of rows.
+    cols - Number of columns.
+    bombs - Amount of bombs.
+    rung - Training steps between evaluations.
+    eval_games - Seeded games per evaluation.
+    seed - Seed of the first evaluation board, the same for all trials.
+    stop_quantile - Stop trials below this quantile of a rung's win rates.
+    min_peers - Trials that must have reached a rung before any is stopped
+                there.
+    workers - Worker processes, all cores if None.
+    out_dir - Directory for the weights of the trials.
+    progress - Callable given each result as it finishes.
+    Returns:
+    List of result dicts, best win rate first.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    settings = {"rows": rows, "cols": cols, "bombs": bombs, "rung": rung,
+                "eval_games": eval_games, "seed": seed,
+                "stop_quantile": stop_quantile, "min_peers": min_peers,
+                "out_dir": out_dir}
+    results = []
+    with multiprocessing.Manager() as manager:
+        rungs = manager.dict()
+        lock = manager.Lock()
+        jobs = [(n, point, settings, rungs, lock)
+                for n, point in enumerate(points)]
+        # A fresh process per trial releases the TensorFlow state
+        with multiprocessing.Pool(workers, initializer=_init_worker,
+                                  maxtasksperchild=1) as pool:
+            for result in pool.imap_unordered(run_trial, jobs):
+                results.append(result)
+                if progress is not None:
+                    progress(result)
+    results.sort(key=lambda r: (-r["win_rate"], r["trial"]))
+    return results
+
+
+def write_table(results, path):
+    """
+    Write results to a CSV file.
+    Arguments:
+    results - List of result dicts.
+    path - File path.
+    """
+    columns = []
+    for result in results:
+        columns += [c for c in result if c not in columns]
+    with open(path, "w", newline="") as f:
+        writer = csv.DictWriter(f, columns)
+        writer.writeheader()
+        writer.writerows(results)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--space",
+                        help="JSON file of the search space")
+    parser.add_argument("--search",
+                        choices=["grid", "random"],
+                        default="grid",
+                        help="search method")
+    parser.add_argument("--trials",
+                        type=int,
+                        default=16,
+                        help="number of trials for random search")
+    parser.add_argument("--griddim",
+                        nargs=2,
+                        type=int,
+                        metavar=("ROWS", "COLS"),
+                        default=[9, 9],
+                        help="set grid dimensions")
+    parser.add_argument("--bombs",
+                        type=int,
+                        default=10,
+                        help="set bomb_limit")
+    parser.add_argument("--rung",
+                        type=int,
+                        default=10000,
+                        help="training steps between evaluations")
+    parser.add_argument("--eval-games",
+                        type=int,
+                        default=200,
+                        help="games per evaluation")
+    parser.add_argument("--stop-quantile",
+                        type=float,
+                        default=0.25,
+                        help="stop trials below this quantile of a rung")
+    parser.add_argument("--min-peers",
+                        type=int,
+                        default=3,
+                        help="trials needed at a rung before stopping any")
+    parser.add_argument("--seed",
+                        type=int,
+                        default=0,
+                        help="seed of the random search and evaluations")
+    parser.add_argument("--workers",
+                        type=int,
+                        default=os.cpu_count(),
+                        help="worker processes, one trial each")
+    parser.add_argument("--out",
+                        default="sweep",
+                        help="directory for the weights and results.csv")
+    args = parser.parse_args()
+
+    space = DEFAULT_SPACE
+    if args.space is not None:
+        with open(args.space) as f:
+            space = json.load(f)
+    if args.search == "grid":
+        points = grid(space)
+    else:
+        points = sample(space, args.trials, np.random.RandomState(args.seed))
+
+    def progress(result):
+        print("Trial {trial}: win rate {win_rate:.3f} after {steps} steps"
+              "{0}".format(" (stopped)" if result["stopped"] else "",
+                           **result))
+
+    print("Running {} trials on {} workers".format(len(points), args.workers))
+    results = sweep(points, args.griddim[0], args.griddim[1], args.bombs,
+                    args.rung, args.eval_games, args.seed, args.stop_quantile,
+                    args.min_peers, args.workers, args.out, progress)
+    path = os.path.join(args.out, "results.csv")
+    write_table(results, path)
+    print("Best trials ({} written):".format(path))
+    for result in results[:5]:
+        print(", ".join("{}={}".format(k, v) for k, v in result.items()))
+
+
+if __name__ == "__main__":
+    main()